@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Make the shared fractal_walks package importable when running the script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from fractal_walks import dragon, tracy_widom
+from fractal_walks import (generate_dragon_curve, dragon_curve_to_graph, LazyDragonGraph, create_tree_graph,
+                           extend_graph_from_node, ImplicitTree, SierpinskiGasket, move_and_extend_dragon,
+                           move_and_extend, move_and_extend_implicit, batch_move_and_extend_dragon, batch_move_and_extend,
+                           kernel_move_and_extend_dragon, kernel_move_and_extend,
+                           tw_cdf, tracy_widom_table, DepthHistogram, tree_depth_distribution, time_averaged_msd)
+from fractal_walks.render import render_walk
+
+# Benchmark suite for every stage of the simulation pipeline.  Each benchmark
+# runs at several problem sizes and reports the best of `repeat` timings together
+# with a throughput in its own unit (points, nodes, steps, frames, ...).
+#
+#   python benchmarks/run.py                          # small and medium sizes
+#   python benchmarks/run.py --sizes large --output results.json
+#   python benchmarks/run.py --compare benchmarks/baseline.json
+#
+# With --compare, every result is checked against the same benchmark and size in
+# the baseline file and the run fails when one is more than --tolerance slower.
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Each setup function takes the size parameter and returns (function to time, units of work)
+
+def dragon_curve(iterations):
+    def run():
+        dragon._curves.clear()
+        generate_dragon_curve(iterations, cache_dir="")
+    return run, 2 ** iterations + 1
+
+def dragon_graph(iterations):
+    curve = generate_dragon_curve(iterations, cache_dir="")
+    return (lambda: dragon_curve_to_graph(curve)), len(curve)
+
+def dragon_lattice_graph(iterations):
+    curve = generate_dragon_curve(iterations, cache_dir="")
+    return (lambda: dragon_curve_to_graph(curve, lattice=True)), len(curve)
+
+def tree_graph(depth):
+    return (lambda: create_tree_graph(depth, 3)), (3 ** (depth + 1) - 1) // 2
+
+# Extend every leaf of a depth-d tree by two levels, as the walk does one leaf at a time
+def tree_extension(depth):
+    leaves = range((3 ** depth - 1) // 2, (3 ** (depth + 1) - 1) // 2)
+    def run():
+        G, max_id = create_tree_graph(depth, 3)
+        for leaf in leaves:
+            max_id = extend_graph_from_node(G, leaf, 2, 3, max_id)
+    return run, len(leaves)
+
+def dragon_walk(steps):
+    curve = generate_dragon_curve(9, cache_dir="")
+    rng = random.Random(0)
+    return (lambda: move_and_extend_dragon(0, dragon_curve_to_graph(curve), steps, 3, rng=rng)), steps
+
+def dragon_lattice_walk(steps):
+    curve = generate_dragon_curve(9, cache_dir="")
+    rng = random.Random(0)
+    return (lambda: move_and_extend_dragon(0, dragon_curve_to_graph(curve, lattice=True), steps, 3, rng=rng)), steps
+
+def dragon_lazy_walk(steps):
+    rng = random.Random(0)
+    return (lambda: move_and_extend_dragon(0, LazyDragonGraph(9), steps, 3, rng=rng)), steps
+
+# Walk on the implicit Sierpinski gasket, growing from level 4
+def gasket_walk(steps):
+    rng = random.Random(0)
+    return (lambda: move_and_extend_dragon(0, SierpinskiGasket(4), steps, 2, rng=rng)), steps
+
+def tree_walk(steps):
+    rng = random.Random(0)
+    return (lambda: move_and_extend(0, create_tree_graph(2, 3)[0], steps, 2, 3, rng=rng)), steps
+
+def tree_implicit_walk(steps):
+    rng = random.Random(0)
+    return (lambda: move_and_extend_implicit(0, ImplicitTree(2, 3), steps, 2, 3, rng=rng)), steps
+
+# 1000 walkers in lockstep, units are walker steps
+def batch_dragon_walk(steps):
+    G = dragon_curve_to_graph(generate_dragon_curve(9, cache_dir=""))
+    return (lambda: batch_move_and_extend_dragon(1000, 0, G, steps, 3, rng=0)), 1000 * steps
+
+# Compiled step kernels (the fallbacks below when numba is not installed)
+def kernel_dragon_walk(steps):
+    kernel_move_and_extend_dragon(0, LazyDragonGraph(9), 10, 3)
+    return (lambda: kernel_move_and_extend_dragon(0, LazyDragonGraph(9), steps, 3, rng=0, record_path=False)), steps
+
+def kernel_tree_walk(steps):
+    kernel_move_and_extend(0, create_tree_graph(2, 3)[0], 10)
+    return (lambda: kernel_move_and_extend(0, create_tree_graph(2, 3)[0], steps, 2, 3, rng=0, record_path=False)), steps
+
+# The kernel walks without numba, at the sizes of dragon_lazy_walk and tree_walk they stand in for
+def kernel_fallback_dragon_walk(steps):
+    return (lambda: kernel_move_and_extend_dragon(0, LazyDragonGraph(9), steps, 3, rng=0, jit=False)), steps
+
+def kernel_fallback_tree_walk(steps):
+    return (lambda: kernel_move_and_extend(0, create_tree_graph(2, 3)[0], steps, 2, 3, rng=0, jit=False)), steps
+
+def batch_tree_walk(steps):
+    return (lambda: batch_move_and_extend(1000, steps, rng=0)), 1000 * steps
+
+# Exact depth distribution of the eagerly extended tree walk, units are walk steps
+def exact_tree_depth(steps):
+    return (lambda: tree_depth_distribution(steps)), steps
+
+# Exact diameter of the lattice subgraph around the origin (the old nx.diameter stage)
+def lattice_diameter(nodes):
+    G = dragon_curve_to_graph(generate_dragon_curve(16, cache_dir=""), lattice=True)
+    subset = np.arange(nodes)
+    return (lambda: G.diameter(subset)), nodes
+
+# Longest root-to-leaf path of a tree (the old nx.dag_longest_path_length stage)
+def tree_longest_path(depth):
+    G, _ = create_tree_graph(depth, 3)
+    return G.longest_path_length, G.num_nodes
+
+def tracy_widom_build(grid_points):
+    def run():
+        tracy_widom._tables.clear()
+        tracy_widom_table(cache_dir="")
+    return run, grid_points
+
+def tracy_widom_cdf(points):
+    tracy_widom_table(cache_dir="")
+    x = np.random.default_rng(0).normal(-1.2, 1.3, points)
+    return (lambda: tw_cdf(x)), points
+
+# Streaming depth histogram and its binned KDE
+def depth_histogram(points):
+    depths = np.random.default_rng(0).poisson(60, points)
+    return (lambda: DepthHistogram().add(depths).kde()), points
+
+# Time-averaged MSD of a 2-D trajectory up to lag 1000, by FFT
+def msd_fft(points):
+    trajectory = np.cumsum(np.random.default_rng(0).integers(-1, 2, (points, 2)), axis=0)
+    return (lambda: time_averaged_msd(trajectory, 1000)), points
+
+# Frames of the GIF renderer, one step per frame
+def gif_frames(frames):
+    curve = generate_dragon_curve(9, cache_dir="")
+    G = dragon_curve_to_graph(curve)
+    path, _, _ = move_and_extend_dragon(0, G, frames, 3, rng=random.Random(0))
+    edges = G.edges()
+    filename = os.path.join(tempfile.mkdtemp(), "walk.gif")
+    return (lambda: render_walk(filename, curve, edges, path)), frames
+
+# name: (setup, unit, {size: parameter})
+BENCHMARKS = {
+    "dragon_curve": (dragon_curve, "points", {"small": 12, "medium": 18, "large": 22}),
+    "dragon_graph": (dragon_graph, "points", {"small": 12, "medium": 16, "large": 20}),
+    "dragon_lattice_graph": (dragon_lattice_graph, "points", {"small": 12, "medium": 16, "large": 20}),
+    "tree_graph": (tree_graph, "nodes", {"small": 6, "medium": 9, "large": 12}),
+    "tree_extension": (tree_extension, "leaves", {"small": 4, "medium": 6, "large": 8}),
+    "dragon_walk": (dragon_walk, "steps", {"small": 1000, "medium": 10000, "large": 100000}),
+    "dragon_lattice_walk": (dragon_lattice_walk, "steps", {"small": 1000, "medium": 10000, "large": 100000}),
+    "dragon_lazy_walk": (dragon_lazy_walk, "steps", {"small": 1000, "medium": 10000, "large": 100000}),
+    "gasket_walk": (gasket_walk, "steps", {"small": 1000, "medium": 10000, "large": 100000}),
+    "tree_walk": (tree_walk, "steps", {"small": 1000, "medium": 10000, "large": 100000}),
+    "tree_implicit_walk": (tree_implicit_walk, "steps", {"small": 1000, "medium": 10000, "large": 100000}),
+    "batch_dragon_walk": (batch_dragon_walk, "walker steps", {"small": 100, "medium": 1000, "large": 10000}),
+    "kernel_dragon_walk": (kernel_dragon_walk, "steps", {"small": 10 ** 5, "medium": 10 ** 6, "large": 10 ** 8}),
+    "kernel_tree_walk": (kernel_tree_walk, "steps", {"small": 10 ** 5, "medium": 10 ** 6, "large": 10 ** 7}),
+    "kernel_fallback_dragon_walk": (kernel_fallback_dragon_walk, "steps",
+                                    {"small": 1000, "medium": 10000, "large": 100000}),
+    "kernel_fallback_tree_walk": (kernel_fallback_tree_walk, "steps", {"small": 1000, "medium": 10000, "large": 100000}),
+    "batch_tree_walk": (batch_tree_walk, "walker steps", {"small": 100, "medium": 1000, "large": 10000}),
+    "exact_tree_depth": (exact_tree_depth, "steps", {"small": 100, "medium": 1000, "large": 10000}),
+    "lattice_diameter": (lattice_diameter, "nodes", {"small": 1000, "medium": 10000, "large": 100000}),
+    "tree_longest_path": (tree_longest_path, "nodes", {"small": 6, "medium": 10, "large": 13}),
+    "tracy_widom_build": (tracy_widom_build, "grid points", {"medium": tracy_widom.GRID_POINTS}),
+    "tracy_widom_cdf": (tracy_widom_cdf, "points", {"small": 10 ** 4, "medium": 10 ** 6, "large": 10 ** 7}),
+    "depth_histogram": (depth_histogram, "points", {"small": 10 ** 4, "medium": 10 ** 6, "large": 10 ** 8}),
+    "msd_fft": (msd_fft, "points", {"small": 10 ** 4, "medium": 10 ** 6, "large": 10 ** 7}),
+    "gif_frames": (gif_frames, "frames", {"small": 20, "medium": 200, "large": 2000}),
+}
+
+# Best and median of `repeat` timings of fn, after one warm-up call
+def measure(fn, repeat):
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times), float(np.median(times))
+
+def run(sizes, repeat, pattern=None):
+    results = {}
+    for name, (setup, unit, params) in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        for size in sizes:
+            if size not in params:
+                continue
+            fn, work = setup(params[size])
+            best, median = measure(fn, repeat)
+            key = f"{name}[{size}]"
+            results[key] = {"parameter": params[size], "unit": unit, "seconds": best, "median": median,
+                            "per_second": work / best}
+            print(f"{key:36s} {best * 1e3:12.3f} ms  {work / best:14.4g} {unit}/s", flush=True)
+    return results
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+# Print the speed of every result relative to the baseline and return the regressions
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"\n{'benchmark':36s} {'baseline':>12s} {'current':>12s} {'ratio':>8s}")
+    for key, result in results.items():
+        if key not in baseline["results"]:
+            continue
+        old = baseline["results"][key]["seconds"]
+        ratio = result["seconds"] / old
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key:36s} {old * 1e3:10.3f}ms {result['seconds'] * 1e3:10.3f}ms {ratio:8.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fractal walk pipeline")
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=["small", "medium", "large"])
+    parser.add_argument("--repeat", type=int, default=3, help="timed repetitions per benchmark, the best one counts")
+    parser.add_argument("--filter", default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument("--output", default=None, help="write the results as JSON to this file")
+    parser.add_argument("--compare", nargs="?", const=BASELINE, default=None,
+                        help="compare against a baseline JSON file (default: benchmarks/baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging, 0.25 = 25%%")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.filter)
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+# Shared building blocks for the random walks on the Dragon Curve and the
+# Sierpinski tree fractal used by the scripts in scripts/.
+from .graph import FractalGraph
+from .dragon import generate_dragon_curve, dragon_curve_to_graph, LatticeIndex, LazyDragonGraph
+from .tree import create_tree_graph, extend_graph_from_node, ImplicitTree
+from .gasket import SierpinskiGasket
+from .walks import move_and_extend_dragon, move_and_extend, move_and_extend_implicit, log_horizons
+from .paths import EncodedPath, decode_path, encode_nodes
+from .sampling import TransitionTable, transition_table
+from .batch import batch_move_and_extend_dragon, batch_move_and_extend
+from .kernels import kernel_move_and_extend_dragon, kernel_move_and_extend, verify_kernels, HAVE_NUMBA
+from .parallel import run_walks, iter_walks, spawn_seeds
+from .sequential import run_sequential, SequentialRun
+from .instrument import WalkStats
+from .histogram import DepthHistogram, plot_histogram
+from .exact import tree_depth_distribution, depth_moments, verify_depth_distribution
+from .diffusion import (EnsembleMSD, BatchMSD, TrajectoryObservables, ScalingFit, time_averaged_msd,
+                        squared_displacements, tree_distances, verify_diffusion)
+from .depth import IntervalDepth, TreeDepth, SubgraphDepth, depth_tracker
+from .store import ResultStore, WALK_COLUMNS, run_walks_to_store
+from .tracy_widom import tw_cdf, tw_pdf, tw_ppf, tw_fit, tracy_widom_table
+from .resampling import (bootstrap_ci, parametric_bootstrap, permutation_test, NormalFamily,
+                         TracyWidomFamily, STATISTICS, TWO_SAMPLE_STATISTICS)
@@ -0,0 +1,7 @@
+import sys
+
+from .cli import main
+
+# python -m fractal_walks <subcommand> ..., see cli.py
+if __name__ == "__main__":
+    sys.exit(main())
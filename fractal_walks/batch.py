@@ -0,0 +1,247 @@
+import numpy as np
+
+from .dragon import generate_dragon_curve, dragon_curve_to_graph, LazyDragonGraph
+from .graph import induced_diameter
+from .sampling import transition_table
+from .walks import Horizons
+
+# Batched versions of the walks in walks.py.  Instead of running N walks one
+# after another, all walkers advance in lockstep and every step is a handful of
+# array operations over the whole batch.  The step rules are the same as the
+# sequential functions, so the depth distributions are statistically identical.
+# With `horizons` the depths are recorded after each listed step count and the
+# result is an (n_walkers, len(horizons)) array instead of one depth per walker.
+# The Dragon Curve walk also takes `visits`, e.g. a render.VisitDensity, whose
+# add() gets the positions of the whole batch after every step, and the same
+# `transitions` (bias ratio, policy or sampling.TransitionTable) as the sequential walk.
+
+# Upper bound on the per-batch working arrays, larger requests are split in batches
+_BATCH_BYTES = 64 << 20
+
+def _batch_sizes(n_walkers, batch_size):
+    for start in range(0, n_walkers, batch_size):
+        yield start, min(batch_size, n_walkers - start)
+
+# Run n_walkers biased walks on the Dragon Curve graph and return their depths
+def batch_move_and_extend_dragon(n_walkers, start_node, G, steps, iterations_to_extend,
+                                 rng=None, batch_size=None, horizons=None, visits=None, transitions=None):
+    rng = np.random.default_rng(rng)
+    table = transition_table(transitions)
+    schedule = Horizons(steps, horizons)
+    steps = schedule.steps
+
+    # The sequential walk extends a fixed graph on its first step when it is too small
+    if not isinstance(G, LazyDragonGraph) and G.num_nodes < (2 ** iterations_to_extend) + 1 and steps > 0 and G.deg[start_node]:
+        G = dragon_curve_to_graph(generate_dragon_curve(iterations_to_extend), lattice=G.coords is not None).compose(G)
+
+    # A lazily grown path can be grown up front: no walker gets further than `steps` nodes
+    margin = 2 ** iterations_to_extend
+    lazy = isinstance(G, LazyDragonGraph)
+    if lazy and G.topology == "path":
+        G.grow_towards(start_node + steps, margin)
+        lazy = False
+
+    # A lazy lattice grows during the walk, and growing also adds junctions to
+    # sites already in the graph, so every walker keeps its own growth count and
+    # only sees the graph it would have grown alone.  Growth appends nodes and
+    # adjacency slots, so that graph is the first counts[k] nodes with the slots
+    # added by growth k or earlier (`added`), and the shared graph is grown as far
+    # as the furthest walker needs.
+    counts = [G.num_nodes]
+    added = np.zeros((G.num_nodes, G.max_degree), dtype=np.int64)
+    unused = np.iinfo(np.int64).max
+
+    # Neighbor table (padded with node 0), degrees and growth of every adjacency slot of the graph as it is now
+    def tables(added):
+        adj = G.adj[:G.num_nodes]
+        grown = np.full(adj.shape, len(counts) - 1, dtype=np.int64)
+        grown[:added.shape[0], :added.shape[1]] = np.minimum(added, len(counts) - 1)
+        return np.where(adj >= 0, adj, 0), G.deg[:G.num_nodes].astype(np.int64), np.where(adj >= 0, grown, unused)
+
+    neighbors, degree, added = tables(added)
+    if batch_size is None:
+        batch_size = max(1, _BATCH_BYTES // max(G.num_nodes, 1))
+
+    # Depth of every visited subgraph in the batch
+    def measure(visited, lowest, highest, growths):
+        if G.topology == "path":
+            # On the path topology the visited set is the interval [lowest, highest]
+            return highest - lowest
+        # Other topologies (lattice graphs have loops), measure each visited subgraph
+        if not lazy:
+            return np.array([G.diameter(np.flatnonzero(row)) for row in visited])
+        depths = []
+        for row, growth in zip(visited, growths.tolist()):
+            nodes = np.flatnonzero(row)
+            depths.append(induced_diameter(nodes, np.where(added[nodes] <= growth, G.adj[nodes], -1)))
+        return np.array(depths)
+
+    depths = np.empty((n_walkers, len(schedule.horizons or [steps])), dtype=np.int64)
+    for offset, size in _batch_sizes(n_walkers, batch_size):
+        batch_schedule = Horizons(steps, horizons)
+        walkers = np.arange(size)
+        current = np.full(size, start_node, dtype=np.int64)
+        visited = np.zeros((size, G.num_nodes), dtype=bool)
+        visited[walkers, current] = True
+        lowest = current.copy()
+        highest = current.copy()
+        growths = np.zeros(size, dtype=np.int64)
+        if batch_schedule.next == 0:
+            batch_schedule.record(measure(visited, lowest, highest, growths))
+        if visits is not None:
+            visits.add(current)
+
+        for step in range(1, steps + 1):
+            # Walkers that come within `margin` nodes of the end of their curve grow it
+            if lazy:
+                near = current + margin >= np.take(counts, growths) - 1
+                while near.any():
+                    if growths.max() + 1 == len(counts):
+                        G.grow()
+                        counts.append(G.num_nodes)
+                        neighbors, degree, added = tables(added)
+                        visited = np.concatenate([visited, np.zeros((size, G.num_nodes - visited.shape[1]),
+                                                                    dtype=bool)], axis=1)
+                    growths += near
+                    near = current + margin >= np.take(counts, growths) - 1
+            # Cumulative weights of the transition table for the visited flags of each walker's neighbors
+            candidates = neighbors[current]
+            degrees = (added[current] <= growths[:, None]).sum(axis=1) if lazy else degree[current]
+            keys = table.keys(visited[walkers[:, None], candidates], degrees)
+            cumulative = table.cumulative[keys, :G.max_degree]
+            totals = table.totals[keys]
+            u = rng.random(size) * totals
+            choice = (cumulative <= u[:, None]).sum(axis=1)
+            moving = totals > 0
+            current = np.where(moving, candidates[walkers, np.minimum(choice, degrees - 1)], current)
+            visited[walkers, current] = True
+            np.minimum(lowest, current, out=lowest)
+            np.maximum(highest, current, out=highest)
+            if visits is not None:
+                visits.add(current)
+            if step == batch_schedule.next:
+                batch_schedule.record(measure(visited, lowest, highest, growths))
+
+        final = measure(visited, lowest, highest, growths)
+        if schedule.horizons is None:
+            depths[offset:offset + size, 0] = final
+        else:
+            depths[offset:offset + size] = np.stack(batch_schedule.result(final), axis=1)
+    return depths if schedule.horizons is not None else depths[:, 0]
+
+# Run n_walkers unbiased walks on lazily extended trees and return their depths
+def batch_move_and_extend(n_walkers, steps, depth=2, depth_to_extend=2, branching_factor=3,
+                          rng=None, batch_size=None, horizons=None):
+    rng = np.random.default_rng(rng)
+    schedule = Horizons(steps, horizons)
+    steps = schedule.steps
+    b = branching_factor
+    max_nodes = steps + 1
+    if batch_size is None:
+        batch_size = max(1, _BATCH_BYTES // (max_nodes * (b + 3) * 4))
+
+    depths = np.empty((n_walkers, len(schedule.horizons or [steps])), dtype=np.int64)
+    for offset, size in _batch_sizes(n_walkers, batch_size):
+        batch_schedule = Horizons(steps, horizons)
+        walkers = np.arange(size)
+
+        # Every walker grows its own tree, only the nodes it has stepped on get an id.
+        # Nodes of the initial tree (level < depth) already have children; deeper
+        # nodes are leaves until the walker stands on them and they get extended.
+        children = np.full((size, max_nodes, b), -1, dtype=np.int32)
+        parent = np.full((size, max_nodes), -1, dtype=np.int32)
+        level = np.zeros((size, max_nodes), dtype=np.int32)
+        extended = np.zeros((size, max_nodes), dtype=bool)
+        extended[:, 0] = depth > 0
+        num_nodes = np.ones(size, dtype=np.int32)
+        current = np.zeros(size, dtype=np.int32)
+        deepest_extension = np.full(size, -1, dtype=np.int64)
+        # Longest root-to-leaf path: the initial tree or one below the deepest extension
+        if batch_schedule.next == 0:
+            batch_schedule.record(np.maximum(depth, deepest_extension + 1))
+
+        for step in range(1, steps + 1):
+            current_level = level[walkers, current]
+            has_parent = current > 0
+            is_leaf = ~extended[walkers, current]
+
+            # A leaf only sees its parent this step and is extended for the next visit.  A root
+            # without children cannot move and is never extended, so its walker stays put for
+            # the rest of the walk, where the sequential walk stops
+            if depth_to_extend > 0:
+                grow = is_leaf & has_parent
+                extended[walkers[grow], current[grow]] = True
+                np.maximum(deepest_extension, np.where(grow, current_level, -1), out=deepest_extension)
+
+            # Otherwise pick uniformly among the children and the parent
+            options = np.where(is_leaf, has_parent, b + has_parent)
+            choice = (rng.random(size) * options).astype(np.int64)
+            up = is_leaf | (choice == b)
+            moving = options > 0
+            slot = np.minimum(choice, b - 1)
+
+            child = children[walkers, current, slot]
+            fresh = moving & ~up & (child < 0)
+            new_ids = num_nodes[fresh]
+            children[walkers[fresh], current[fresh], slot[fresh]] = new_ids
+            parent[walkers[fresh], new_ids] = current[fresh]
+            level[walkers[fresh], new_ids] = current_level[fresh] + 1
+            extended[walkers[fresh], new_ids] = current_level[fresh] + 1 < depth
+            num_nodes += fresh
+            child = children[walkers, current, slot]
+
+            current = np.where(moving, np.where(up, parent[walkers, current], child), current)
+            if step == batch_schedule.next:
+                batch_schedule.record(np.maximum(depth, deepest_extension + 1))
+
+        final = np.maximum(depth, deepest_extension + 1)
+        if schedule.horizons is None:
+            depths[offset:offset + size, 0] = final
+        else:
+            depths[offset:offset + size] = np.stack(batch_schedule.result(final), axis=1)
+    return depths if schedule.horizons is not None else depths[:, 0]
+
+# Compare the batched walks with the sequential ones: for every configuration
+# the depths of n_walks walks of each must pass a two-sample KS permutation test
+# at level alpha.  Raises AssertionError on the first failure and returns the
+# list of (case, batched mean, sequential mean, p-value).
+def verify_batch(n_walks=400, steps=500, seed=0, alpha=0.001):
+    import random
+
+    from .resampling import permutation_test
+    from .tree import create_tree_graph
+    from .walks import move_and_extend_dragon, move_and_extend
+
+    dragon_cases = {
+        "path": lambda: dragon_curve_to_graph(generate_dragon_curve(9)),
+        "lattice": lambda: dragon_curve_to_graph(generate_dragon_curve(9), lattice=True),
+        "lazy path": lambda: LazyDragonGraph(4),
+        "lazy lattice": lambda: LazyDragonGraph(4, lattice=True),
+    }
+    rng = random.Random(seed)
+    report = []
+    for name, make_graph in dragon_cases.items():
+        batched = batch_move_and_extend_dragon(n_walks, 0, make_graph(), steps, 3, rng=seed)
+        sequential = [move_and_extend_dragon(0, make_graph(), steps, 3, rng=rng, record_path=False)[1]
+                      for _ in range(n_walks)]
+        _, p_value = permutation_test(batched, sequential, "ks", seed=seed)
+        if p_value < alpha:
+            raise AssertionError(f"batched dragon walk ({name}) differs from move_and_extend_dragon: mean depth "
+                                 f"{np.mean(batched):.2f} against {np.mean(sequential):.2f}, KS p = {p_value:.4f}")
+        report.append((f"dragon {name}", float(np.mean(batched)), float(np.mean(sequential)), p_value))
+
+    for depth, depth_to_extend in [(2, 2), (0, 2), (3, 0)]:
+        batched = batch_move_and_extend(n_walks, steps, depth, depth_to_extend, 3, rng=seed)
+        sequential = [move_and_extend(0, create_tree_graph(depth, 3)[0], steps, depth_to_extend, 3, rng=rng,
+                                      record_path=False)[1][0] for _ in range(n_walks)]
+        name = f"tree depth={depth} depth_to_extend={depth_to_extend}"
+        _, p_value = permutation_test(batched, sequential, "ks", seed=seed)
+        if p_value < alpha:
+            raise AssertionError(f"batched tree walk ({name}) differs from move_and_extend: mean depth "
+                                 f"{np.mean(batched):.2f} against {np.mean(sequential):.2f}, KS p = {p_value:.4f}")
+        report.append((name, float(np.mean(batched)), float(np.mean(sequential)), p_value))
+    return report
+
+if __name__ == "__main__":
+    for case, batched, sequential, p_value in verify_batch():
+        print(f"ok  {case}: mean depth {batched:.2f} batched, {sequential:.2f} sequential, KS p = {p_value:.3f}")
@@ -0,0 +1,330 @@
+import argparse
+import json
+import random
+import sys
+from functools import partial
+from operator import itemgetter
+
+import numpy as np
+
+from .dragon import generate_dragon_curve, dragon_curve_to_graph
+from .gasket import SierpinskiGasket
+from .paths import decode_path
+from .sequential import run_sequential
+from .tree import create_tree_graph
+from .walks import move_and_extend_dragon, move_and_extend
+
+# Command line entry point for the pipelines of the scripts, with every
+# parameter taken from flags or a config file instead of module-level variables:
+#
+#   python -m fractal_walks simulate --fractal dragon --walks 1000 --steps 2000 --output depths.npy
+#   python -m fractal_walks histogram --fractal tree --horizons 1000 1001 --walks 10000 --mean-width 1
+#   python -m fractal_walks ks-test --config run.json
+#   python -m fractal_walks animate --fractal gasket --steps 500 --output gasket.gif
+#
+# A config file (.json, or .toml on Python 3.11+) holds the same options under
+# their flag names, either at the top level or in a table named after the
+# subcommand, which wins over the top level; flags win over both:
+#
+#   {"fractal": "dragon", "steps": 2000, "seed": 1, "ks-test": {"n-resamples": 5000}}
+#
+# Only numpy and the walk modules are imported up front.  matplotlib is imported
+# by the subcommands that plot and the statistics by the tests, so `simulate`
+# and the pool workers of every run start without them.
+
+# Extension size of each fractal when --extend is not given: iterations of the
+# Dragon Curve, tree depth or gasket levels
+EXTEND = {"dragon": 3, "tree": 2, "gasket": 2}
+
+def load_config(filename):
+    if filename.endswith(".toml"):
+        import tomllib
+
+        with open(filename, "rb") as f:
+            return tomllib.load(f)
+    with open(filename) as f:
+        return json.load(f)
+
+# Options of the walk itself, shared by every subcommand
+def _walk_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--config", default=None, help="JSON or TOML file with default values for the options")
+    parser.add_argument("--fractal", default="dragon", choices=sorted(EXTEND))
+    parser.add_argument("--steps", type=int, default=1000, help="steps of each random walk")
+    parser.add_argument("--extend", type=int, default=None,
+                        help="iterations, depth or levels added per extension (default: 3 dragon, 2 tree and gasket)")
+    parser.add_argument("--bias", type=float, default=3,
+                        help="weight of an unvisited neighbor against 1 for a visited one (dragon and gasket)")
+    parser.add_argument("--seed", type=int, default=None, help="master seed, set it to make the run reproducible")
+    parser.add_argument("--iterations", type=int, default=9, help="iterations of the initial Dragon Curve")
+    parser.add_argument("--lattice", action="store_true", help="merge Dragon Curve points on the same lattice site")
+    parser.add_argument("--depth", type=int, default=2, help="depth of the initial tree")
+    parser.add_argument("--branching-factor", type=int, default=3, help="children of each tree node")
+    parser.add_argument("--level", type=int, default=4, help="level of the initial Sierpinski gasket")
+    parser.add_argument("--fixed", action="store_true", help="keep the walker on the initial gasket level")
+    return parser
+
+# Options of the Monte Carlo runs, shared by the subcommands that collect depths
+def _run_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--walks", type=int, default=1000,
+                        help="number of walks, or their budget when a stopping width is given")
+    parser.add_argument("--horizons", type=int, nargs="+", default=None,
+                        help="steps at which the depth of every walk is recorded, in place of --steps")
+    parser.add_argument("--batch-size", type=int, default=250, help="walks between two checks of the stopping widths")
+    parser.add_argument("--mean-width", type=float, default=None,
+                        help="stop once the 95%% confidence interval of the mean depth is narrower than this")
+    parser.add_argument("--median-width", type=float, default=None,
+                        help="... and the one of the median depth narrower than this")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all cores)")
+    return parser
+
+def _test_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--n-resamples", type=int, default=1000,
+                        help="bootstrap resamples for the confidence interval and the p-value")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level")
+    return parser
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m fractal_walks",
+                                     description="Random walks on the Dragon Curve and Sierpinski fractals")
+    commands = parser.add_subparsers(dest="command", required=True)
+    walk, run, test = _walk_options(), _run_options(), _test_options()
+    commands.add_parser("simulate", parents=[walk, run], help="run the walks and summarize their depths").add_argument(
+        "--output", default=None, help="save the depths, raw to a .npy file and as a DepthHistogram otherwise")
+    for name, help in [("histogram", "histogram and KDE of the depths"), ("boxplot", "boxplot of the depths")]:
+        commands.add_parser(name, parents=[walk, run], help=help).add_argument(
+            "--output", default=None, help="save the figure to this file instead of showing it")
+    commands.add_parser("ks-test", parents=[walk, run, test],
+                        help="Kolmogorov-Smirnov test of the depths against the Tracy-Widom distribution")
+    commands.add_parser("shapiro", parents=[walk, run, test],
+                        help="Shapiro-Wilk test of normality of the depths").set_defaults(fractal="tree")
+    animate = commands.add_parser("animate", parents=[walk], help="render one walk as a GIF or video")
+    animate.add_argument("--output", default="random_walk.gif", help=".gif through Pillow, other formats through ffmpeg")
+    animate.add_argument("--fps", type=int, default=20)
+    animate.add_argument("--max-frames", type=int, default=500, help="longer walks advance several steps per frame")
+    return parser, commands.choices
+
+# Config values for a subcommand: the top level updated by its own table, with
+# the keys turned into argument names.  Top-level options of other subcommands
+# are skipped, so one file can serve them all.
+def config_defaults(config, command, subparsers, filename):
+    def dests(name):
+        return {action.dest for action in subparsers[name]._actions} - {"config", "help"}
+
+    known = dests(command)
+    shared = set().union(*map(dests, subparsers))
+    defaults = {}
+    for table, keys in [(config, shared), (config.get(command, {}), known)]:
+        for key, value in table.items():
+            dest = key.replace("-", "_")
+            if isinstance(value, dict) and table is config and key in subparsers:
+                continue
+            if dest not in keys:
+                subparsers[command].error(f"unknown option {key!r} in {filename}")
+            if dest in known:
+                defaults[dest] = value
+    return defaults
+
+# (walk, make_graph, walk_args, walk_kwargs) of the fractal selected by the options
+def walk_setup(args):
+    extend = EXTEND[args.fractal] if args.extend is None else args.extend
+    steps = args.steps
+    if args.fractal == "tree":
+        return (move_and_extend, partial(create_tree_graph, args.depth, args.branching_factor),
+                (steps, extend, args.branching_factor), {})
+    if args.fractal == "gasket":
+        make_graph = partial(SierpinskiGasket, args.level, not args.fixed)
+    else:
+        make_graph = partial(dragon_curve_to_graph, generate_dragon_curve(args.iterations), args.lattice)
+    return move_and_extend_dragon, make_graph, (steps, extend), {"transitions": args.bias}
+
+# Depths of the walks, in batches until the stopping widths hold or --walks is reached
+def collect(args, keep_values=False):
+    walk, make_graph, walk_args, walk_kwargs = walk_setup(args)
+    walk_kwargs.update(record_path=False, horizons=args.horizons)
+    quantile_widths = None if args.median_width is None else {0.5: args.median_width}
+    run = run_sequential(walk, make_graph, walk_args=walk_args, walk_kwargs=walk_kwargs, start_node=0,
+                         extract=itemgetter(1), seed=args.seed, processes=args.processes, batch_size=args.batch_size,
+                         max_walks=args.walks, mean_width=args.mean_width, quantile_widths=quantile_widths,
+                         keep_values=keep_values)
+    print(run.report())
+    return run
+
+# One flat array of depths, the tree walks and horizons give a list per walk
+def _depths(values):
+    return np.concatenate([np.ravel(value) for value in values]).astype(float)
+
+def _description(args, n_walks):
+    steps = args.steps if args.horizons is None else " & ".join(map(str, args.horizons))
+    if args.fractal == "tree":
+        return f"Sierpinski Fractal : Simulations = {n_walks}, Steps per Simulation = {steps}"
+    name = f"Dragon Curve : n = {args.iterations}" if args.fractal == "dragon" else \
+        f"Sierpinski Gasket : Level = {args.level}"
+    return f"{name}, Simulations = {n_walks}, Steps per Simulation = {steps} : Probabilty {args.bias:g} to 1"
+
+def _pyplot(output):
+    import matplotlib
+
+    if output is not None:
+        matplotlib.use("Agg") # Nothing is shown, so no display is needed either
+    import matplotlib.pyplot as plt
+
+    return plt
+
+def _finish(plt, output):
+    plt.tight_layout()
+    if output is None:
+        plt.show()
+    else:
+        plt.savefig(output)
+        print(f"Saved {output}")
+
+def simulate(args):
+    run = collect(args, keep_values=args.output is not None and args.output.endswith(".npy"))
+    hist = run.histogram
+    low, high = run.quantile_interval(0.5)
+    print(f"Mean depth: {hist.mean:.3f} (std {hist.std:.3f}), median: {run.quantile(0.5)} ({low} to {high}), "
+          f"range: {hist.min} to {hist.max}")
+    if args.output is not None:
+        if run.values is not None:
+            np.save(args.output, _depths(run.values))
+        else:
+            hist.save(args.output)
+        print(f"Saved {args.output}")
+
+def histogram(args):
+    from .histogram import plot_histogram
+
+    run = collect(args)
+    result = run.histogram
+    plt = _pyplot(args.output)
+    # Plot histogram of depths with the KDE (Kernel Density Estimation) scaled to align with its frequencies
+    plt.figure(figsize=(10, 6))
+    plot_histogram(result, bins=range(int(result.min), int(result.max) + 2))
+    plt.title(f"Histogram for {_description(args, run.n_walks)}")
+    plt.xlabel("Depth")
+    plt.ylabel("Frequency")
+    plt.legend()
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    _finish(plt, args.output)
+
+def boxplot(args):
+    run = collect(args, keep_values=True)
+    result = _depths(run.values)
+    plt = _pyplot(args.output)
+    plt.figure(figsize=(12, 6))
+    plt.boxplot(result, vert=False, patch_artist=True, notch=True,
+                boxprops=dict(facecolor="lightblue", color="blue"),
+                medianprops=dict(color="red", linewidth=2),
+                whiskerprops=dict(color="blue", linewidth=1.5),
+                capprops=dict(color="blue", linewidth=1.5),
+                flierprops=dict(markerfacecolor='orange', marker='o', markersize=6))
+    mean_depth = np.mean(result)
+    median_depth = np.median(result)
+    plt.axvline(mean_depth, color='green', linestyle='--', label=f"Mean: {mean_depth:.2f}")
+    plt.axvline(median_depth, color='red', linestyle='-', label=f"Median: {median_depth:.2f}")
+    plt.title(f"Boxplot for {_description(args, run.n_walks)}")
+    plt.xlabel("Graph Depth")
+    plt.legend()
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    _finish(plt, args.output)
+
+# Bootstrap confidence interval and parametric-bootstrap p-value of a
+# goodness-of-fit statistic, the parameters being fitted to the depths
+def _goodness_of_fit(args, result, statistic, family):
+    from .resampling import bootstrap_ci, parametric_bootstrap
+
+    stat, low, high = bootstrap_ci(result, statistic, family, n_resamples=args.n_resamples, seed=args.seed,
+                                   processes=args.processes)
+    _, p_value = parametric_bootstrap(result, statistic, family, n_resamples=args.n_resamples, seed=args.seed,
+                                      processes=args.processes)
+    return stat, low, high, p_value
+
+def ks_test(args):
+    from .resampling import TracyWidomFamily
+    from .tracy_widom import tw_fit
+
+    result = _depths(collect(args, keep_values=True).values)
+    loc, scale = tw_fit(result)
+    print(f"TW1 location: {loc}, scale: {scale}")
+    ks_stat, low, high, p_value = _goodness_of_fit(args, result, "ks", TracyWidomFamily(beta=1))
+    print(f"KS Statistic: {ks_stat} (95% CI {low} to {high}), P-value: {p_value}")
+    if p_value > args.alpha:
+        print("The data is likely from the Tracy-Widom distribution (fail to reject H0).")
+    else:
+        print("The data is not from the Tracy-Widom distribution (reject H0).")
+
+def shapiro(args):
+    from .resampling import NormalFamily
+
+    result = _depths(collect(args, keep_values=True).values)
+    stat, low, high, p_value = _goodness_of_fit(args, result, "shapiro", NormalFamily())
+    print("Shapiro-Wilk Test Statistic:", stat)
+    print("95% Confidence Interval:", (low, high))
+    print("P-value:", p_value)
+    if p_value > args.alpha:
+        print("Data looks normally distributed (fail to reject H0)")
+    else:
+        print("Data does not look normally distributed (reject H0)")
+
+# Layered layout of a tree: one row per level, each level ordered by its parents
+def _tree_positions(G):
+    n = G.num_nodes
+    level, pred = G.level[:n], G.pred[:n]
+    x = np.zeros(n)
+    for depth in range(1, int(level.max(initial=0)) + 1):
+        nodes = np.flatnonzero(level == depth)
+        nodes = nodes[np.lexsort((nodes, x[pred[nodes]]))]
+        x[nodes] = np.arange(len(nodes)) - (len(nodes) - 1) / 2
+    return np.stack([x, -level.astype(float)], axis=1)
+
+# Positions indexed by node id, NaN for the ids the gasket does not use
+def _gasket_positions(G):
+    vertices = G.vertices()
+    positions = np.full((int(vertices[-1]) + 1, 2), np.nan)
+    positions[vertices] = G.positions_of(vertices)
+    return positions
+
+def animate(args):
+    from .render import render_walk
+
+    walk, make_graph, walk_args, walk_kwargs = walk_setup(args)
+    rng = random.Random(args.seed)
+    if args.fractal == "tree":
+        G, _ = make_graph()
+        moves, _ = walk(0, G, *walk_args, rng=rng, record_path="moves")
+        positions, by, options = _tree_positions(G), "edge", dict(node_size=500, node_color="lightblue", labels=True)
+        title = "Sierpinski Fractal Random Walk : Step {step}/{steps} - Current Edge: {edge}"
+    else:
+        moves, _, G = walk(0, make_graph(), *walk_args, rng=rng, record_path="moves", **walk_kwargs)
+        by, options = "node", {}
+        if args.fractal == "gasket":
+            positions = _gasket_positions(G)
+            title = f"Sierpinski Gasket with level = {args.level}"
+        else:
+            # Map graph nodes to lattice positions, the graph only outgrows the initial curve when it was extended
+            curve = generate_dragon_curve(args.iterations)
+            positions = G.coords if args.lattice else \
+                curve if G.num_nodes == len(curve) else generate_dragon_curve(walk_args[1])
+            title = f"Dragon Curve Graph with n = {args.iterations}"
+        title += " : Random Walk Path - Step {step}/{steps}, Current Edge: {edge}"
+    frames = render_walk(args.output, positions, G.edges(), decode_path(moves, G), by=by, title=title, fps=args.fps,
+                         max_frames=args.max_frames, **options)
+    print(f"Saved {args.output} ({frames} frames)")
+
+HANDLERS = {"simulate": simulate, "histogram": histogram, "boxplot": boxplot, "ks-test": ks_test,
+            "shapiro": shapiro, "animate": animate}
+
+def main(argv=None):
+    parser, subparsers = build_parser()
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = parser.parse_args(argv)
+    if args.config is not None:
+        # The config only changes defaults, so parsing again lets the flags win
+        defaults = config_defaults(load_config(args.config), args.command, subparsers, args.config)
+        subparsers[args.command].set_defaults(**defaults)
+        args = parser.parse_args(argv)
+    HANDLERS[args.command](args)
+    return 0
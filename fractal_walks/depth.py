@@ -0,0 +1,110 @@
+import numpy as np
+
+# Online depth trackers for the Dragon Curve walk.  A walk reports every node it
+# visits for the first time together with the visited neighbor it came from, and
+# the tracker keeps the diameter of the visited subgraph up to date, so the depth
+# can be read after any step instead of only once at the end of the walk.
+
+# Trackers also get invalidate() calls when the graph grows under the walk; only
+# graphs that can gain edges between visited nodes (lattices) need to react.
+
+# Path topology: node i is joined to i - 1 and i + 1, so the visited set is an
+# interval and its diameter is the spread of the visited indices
+class IntervalDepth:
+    def __init__(self, start_node):
+        self.lowest = self.highest = start_node
+
+    def add(self, node, via):
+        if node < self.lowest:
+            self.lowest = node
+        elif node > self.highest:
+            self.highest = node
+
+    @property
+    def depth(self):
+        return self.highest - self.lowest
+
+    def invalidate(self):
+        pass
+
+# Tree topology: every new node hangs off exactly one visited node, so the visited
+# subgraph stays a tree.  Its diameter only changes when the new node is farther
+# from one of the two current diameter endpoints, and tree distances come from
+# binary-lifting ancestor tables in O(log n) per node.
+class TreeDepth:
+    def __init__(self, start_node):
+        self.level = {start_node: 0}
+        self.ancestors = {start_node: []}
+        self.ends = (start_node, start_node)
+        self.depth = 0
+
+    def _lca(self, u, v):
+        level, ancestors = self.level, self.ancestors
+        if level[u] < level[v]:
+            u, v = v, u
+        diff = level[u] - level[v]
+        k = 0
+        while diff:
+            if diff & 1:
+                u = ancestors[u][k]
+            diff >>= 1
+            k += 1
+        if u == v:
+            return u
+        for k in range(len(ancestors[u]) - 1, -1, -1):
+            if k < len(ancestors[u]) and ancestors[u][k] != ancestors[v][k]:
+                u, v = ancestors[u][k], ancestors[v][k]
+        return ancestors[u][0]
+
+    def distance(self, u, v):
+        return self.level[u] + self.level[v] - 2 * self.level[self._lca(u, v)]
+
+    def add(self, node, via):
+        self.level[node] = self.level[via] + 1
+        # ancestors[node][k] is the 2^k-th ancestor of node
+        table = [via]
+        while len(self.ancestors[table[-1]]) >= len(table):
+            table.append(self.ancestors[table[-1]][len(table) - 1])
+        self.ancestors[node] = table
+
+        a, b = self.ends
+        to_a, to_b = self.distance(node, a), self.distance(node, b)
+        if to_a >= to_b and to_a > self.depth:
+            self.ends, self.depth = (a, node), to_a
+        elif to_b > self.depth:
+            self.ends, self.depth = (node, b), to_b
+
+    def invalidate(self):
+        pass
+
+# Any other topology (lattice graphs and the gasket have loops): the exact diameter is recomputed
+# with a bounded number of BFS sweeps, and only when it is queried after the
+# visited set changed
+class SubgraphDepth:
+    def __init__(self, G, start_node):
+        self.G = G
+        self.nodes = [start_node]
+        self._depth = 0
+        self._stale = False
+
+    def add(self, node, via):
+        self.nodes.append(node)
+        self._stale = True
+
+    def invalidate(self):
+        self._stale = True
+
+    @property
+    def depth(self):
+        if self._stale:
+            self._depth = self.G.diameter(np.array(self.nodes))
+            self._stale = False
+        return self._depth
+
+# Pick the cheapest exact tracker for the topology of G
+def depth_tracker(G, start_node):
+    if G.topology == "path":
+        return IntervalDepth(start_node)
+    if G.topology == "tree":
+        return TreeDepth(start_node)
+    return SubgraphDepth(G, start_node)
@@ -0,0 +1,183 @@
+import os
+
+import numpy as np
+
+from .graph import FractalGraph
+
+# Directory of the on-disk curve cache, unset means the curves are only memoized in memory
+CACHE_ENV = "FRACTAL_WALKS_CACHE"
+
+# Points are generated in blocks of this many segments to bound temporary memory
+_BLOCK = 1 << 22
+
+# Unit steps for the four lattice directions (right, up, left, down)
+_STEPS = np.array([[1, 0], [0, 1], [-1, 0], [0, -1]], dtype=np.int32)
+
+_curves = {}
+
+# Fill rows [start, stop) of the curve from the closed form of the turn sequence.
+# The turn before segment k only depends on the bit above the lowest set bit of k:
+# writing k = m * 2^j with m odd, the curve turns right when m = 1 (mod 4) and left
+# otherwise.  The segment direction is the running sum of the turns modulo 4.
+def _fill_curve(out, start, stop, direction, position):
+    k = np.arange(start, stop, dtype=np.int64)
+    odd_part = k // np.maximum(k & -k, 1)
+    turns = np.where(odd_part & 3 == 1, 3, 1).astype(np.uint8)
+    if start == 0:
+        turns[0] = 0
+    # uint8 wraps modulo 256, which keeps the running sum correct modulo 4
+    directions = (np.cumsum(turns, dtype=np.uint8) + np.uint8(direction)) & 3
+    points = np.cumsum(_STEPS[directions], axis=0, dtype=np.int32) + position
+    out[start + 1:stop + 1] = points
+    return int(directions[-1]), points[-1]
+
+# Function to generate the Dragon Curve up to a specified number of iterations.
+# Returns the 2^iterations + 1 integer lattice points as an (n, 2) int32 array of
+# (x, y) rows; the array is shared and read-only.
+def generate_dragon_curve(iterations, cache_dir=None):
+    if iterations in _curves:
+        return _curves[iterations]
+
+    cache_dir = os.environ.get(CACHE_ENV) if cache_dir is None else cache_dir
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, f"dragon_{iterations}.npy")
+        if os.path.exists(cache_path):
+            curve = np.load(cache_path, mmap_mode="r")
+            _curves[iterations] = curve
+            return curve
+
+    segments = 1 << iterations
+    if cache_path is not None:
+        # Write straight into the memory-mapped cache file, then swap it in atomically
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        curve = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.int32, shape=(segments + 1, 2))
+    else:
+        curve = np.empty((segments + 1, 2), dtype=np.int32)
+
+    curve[0] = 0
+    direction, position = 0, curve[0]
+    for start in range(0, segments, _BLOCK):
+        direction, position = _fill_curve(curve, start, min(start + _BLOCK, segments), direction, position)
+
+    if cache_path is not None:
+        curve.flush()
+        del curve
+        os.replace(tmp_path, cache_path)
+        curve = np.load(cache_path, mmap_mode="r")
+    else:
+        curve.setflags(write=False)
+    _curves[iterations] = curve
+    return curve
+
+# Sorted-key index from lattice coordinates to node ids.  Coordinates are packed
+# into one int64 key per point so lookups are a vectorized binary search.
+class LatticeIndex:
+    def __init__(self, coords):
+        coords = np.asarray(coords, dtype=np.int64)
+        self.origin = coords.min(axis=0) if len(coords) else np.zeros(2, dtype=np.int64)
+        self.width = int(coords[:, 1].max() - self.origin[1]) + 1 if len(coords) else 1
+        keys = self.keys(coords)
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    # Pack (x, y) rows into int64 keys relative to the bounding box
+    def keys(self, coords):
+        coords = np.asarray(coords, dtype=np.int64) - self.origin
+        return coords[..., 0] * self.width + coords[..., 1]
+
+    # Node ids of the given (x, y) rows, -1 where no node sits on that site
+    def lookup(self, coords):
+        coords = np.asarray(coords, dtype=np.int64)
+        inside = (coords >= self.origin).all(axis=-1) & (coords[..., 1] - self.origin[1] < self.width)
+        keys = np.where(inside, self.keys(coords), -1)
+        pos = np.minimum(np.searchsorted(self.sorted_keys, keys), len(self.sorted_keys) - 1)
+        found = inside & (self.sorted_keys[pos] == keys)
+        return np.where(found, self.order[pos], -1)
+
+# Convert the Dragon Curve into a graph representation.
+# By default node i is the i-th point of the curve and edges join consecutive
+# points, which gives a simple path.  With lattice=True points that land on the
+# same lattice site are merged into one node, so the places where the curve
+# revisits a site become junctions of degree up to 4.  Lattice nodes are numbered
+# in order of first appearance along the curve, so node 0 is still the origin.
+def dragon_curve_to_graph(curve, lattice=False):
+    if not lattice:
+        # Add edges between consecutive points
+        nodes = np.arange(len(curve) - 1)
+        G = FractalGraph.from_edges(nodes, nodes + 1, num_nodes=len(curve))
+        G.topology = "path"
+        return G
+
+    curve = np.asarray(curve)
+    point_node, first_point = _merge_sites(curve)
+    G = FractalGraph.from_edges(point_node[:-1], point_node[1:], num_nodes=len(first_point))
+    G.coords = np.ascontiguousarray(curve[first_point], dtype=np.int32)
+    G.index = LatticeIndex(G.coords)
+    G.topology = "lattice"
+    return G
+
+# Merge coincident points: returns the site label of every point, with sites
+# numbered by first appearance, and the index of the first point of each site
+def _merge_sites(points):
+    index = LatticeIndex(points)
+    keys = index.sorted_keys
+    # Label each group of coincident points by the first point in it
+    group_start = np.concatenate([[True], keys[1:] != keys[:-1]])
+    group = np.cumsum(group_start) - 1
+    first_point = np.minimum.reduceat(index.order, np.flatnonzero(group_start))
+    rank = np.empty(len(first_point), dtype=np.int64)
+    rank[np.argsort(first_point, kind="stable")] = np.arange(len(first_point))
+    point_node = np.empty(len(points), dtype=np.int64)
+    point_node[index.order] = rank[group]
+    return point_node, np.sort(first_point)
+
+# Dragon Curve graph that grows on demand.  The curve of iteration n + 1 starts
+# with the curve of iteration n, so growing means appending the next half of the
+# curve in place: the number of points doubles each time, which keeps the cost
+# amortized O(1) per node and never copies the graph.  Walks call grow_towards
+# with the node they stand on and the graph only grows once that node comes
+# within `margin` nodes of the newest end of the curve.  Lattice nodes are
+# numbered by first appearance, so there the margin is measured the same way
+# and growing may also add junctions at sites that are already in the graph.
+class LazyDragonGraph(FractalGraph):
+    def __init__(self, iterations, lattice=False, cache_dir=None):
+        self.iterations = iterations
+        self.cache_dir = cache_dir
+        self.curve = generate_dragon_curve(iterations, cache_dir=cache_dir)
+        self.__dict__.update(dragon_curve_to_graph(self.curve, lattice=lattice).__dict__)
+        if lattice:
+            self.point_node = _merge_sites(self.curve)[0]
+
+    def grow(self):
+        old_points = len(self.curve)
+        self.iterations += 1
+        self.curve = generate_dragon_curve(self.iterations, cache_dir=self.cache_dir)
+        new_points = self.curve[old_points:]
+
+        if self.topology == "path":
+            nodes = np.arange(old_points - 1, len(self.curve) - 1)
+            self.append_edges(nodes, nodes + 1)
+            return
+
+        # Points on sites the graph already has reuse their node, the rest become new nodes
+        node = self.index.lookup(new_points)
+        fresh = node < 0
+        fresh_node, first_point = _merge_sites(new_points[fresh])
+        node[fresh] = self.num_nodes + fresh_node
+        self.coords = np.concatenate([self.coords, new_points[fresh][first_point]]).astype(np.int32)
+        self.index = LatticeIndex(self.coords)
+
+        # The curve never runs along the same lattice edge twice, so every edge is new
+        point_node = np.concatenate([self.point_node[-1:], node])
+        self.append_edges(point_node[:-1], point_node[1:])
+        self.point_node = np.concatenate([self.point_node, node])
+
+    # Grow until `node` is more than `margin` nodes away from the end of the curve
+    def grow_towards(self, node, margin):
+        grown = False
+        while node + margin >= self.num_nodes - 1:
+            self.grow()
+            grown = True
+        return grown
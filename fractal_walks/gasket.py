@@ -0,0 +1,229 @@
+import numpy as np
+
+from .graph import induced_diameter
+
+# The Sierpinski gasket as an implicit graph.  The level-n gasket is made of 3^n
+# unit triangles, and unit triangle t has the ternary address of its position:
+# digit k of t says which of the three copies of the level-(k + 1) gasket holds
+# it (0 at the origin corner, 1 along the x axis, 2 along the y axis).  On the
+# triangular lattice with corners (0, 0), (2^n, 0) and (0, 2^n) the triangle with
+# lower corner (x, y) exists exactly when x & y == 0, and its address is x's bits
+# written as ternary digits 1 plus y's bits as digits 2.  So neighbors, addresses
+# and coordinates are all bit arithmetic and no edge is ever stored.
+#
+# Vertices are numbered from the address of a unit triangle they belong to:
+# 2 t for the lower corner of triangle t and 2 t + 1 for its corner along the x
+# axis when that vertex is nobody's lower corner (it then joins two triangles).
+# The ids of the level-n gasket stay the same at every higher level, so the graph
+# grows without renumbering, and they lie below 4 * 3^n + 1.
+#
+#   G = SierpinskiGasket(4)                       # grows past level 4 as the walker needs
+#   path, depth, G = move_and_extend_dragon(0, G, 10 ** 5, 3)
+#   G = SierpinskiGasket(20, lazy=False)          # a fixed level-20 gasket, 5 * 10^9 vertices
+#
+# With lazy=True the outer corners (2^n, 0) and (0, 2^n) are joined to the next
+# copies once the walker comes within `margin` steps of them (grow_towards), so
+# the walk runs on the infinite gasket rooted at the origin; with lazy=False they
+# keep degree 2 and the walker stays on the level-n gasket.  Either way the walk
+# only allocates its visited flags for the smallest sub-gasket it has come close
+# to (`capacity`), not for the whole graph.
+
+_CHUNK = 3 ** 8
+_BITS = np.arange(256)
+# Ternary value of the 8-bit patterns with every bit as the digit 1
+_SPREAD = sum(((_BITS >> k) & 1) * 3 ** k for k in range(8)).astype(np.int64)
+_DIGITS = np.arange(_CHUNK)[:, None] // 3 ** np.arange(8) % 3
+# Bits of x and y for every 8-digit ternary chunk (digits 1 and 2)
+_X_BITS = ((_DIGITS == 1) << np.arange(8)).sum(axis=1).astype(np.int64)
+_Y_BITS = ((_DIGITS == 2) << np.arange(8)).sum(axis=1).astype(np.int64)
+_SPREAD_LIST, _X_LIST, _Y_LIST = _SPREAD.tolist(), _X_BITS.tolist(), _Y_BITS.tolist()
+
+# Address of the triangle with lower corner (x, y)
+def _triangle(x, y):
+    t = 0
+    scale = 1
+    while x or y:
+        t += (_SPREAD_LIST[x & 255] + 2 * _SPREAD_LIST[y & 255]) * scale
+        x >>= 8
+        y >>= 8
+        scale *= _CHUNK
+    return t
+
+# Lower corner of triangle t
+def _corner(t):
+    x = y = shift = 0
+    while t:
+        t, chunk = divmod(t, _CHUNK)
+        x |= _X_LIST[chunk] << shift
+        y |= _Y_LIST[chunk] << shift
+        shift += 8
+    return x, y
+
+class SierpinskiGasket:
+    topology = "gasket"
+    directed = False
+    coords = None
+
+    def __init__(self, level, lazy=True):
+        self.level = level
+        self.lazy = lazy
+        # Level of the sub-gasket at the origin the walk has come close to
+        self.reach = level if lazy else 0
+
+    @property
+    def size(self):
+        return 1 << self.level
+
+    # Vertices and edges of the current level
+    @property
+    def num_nodes(self):
+        return (3 ** (self.level + 1) + 3) // 2
+
+    @property
+    def num_edges(self):
+        return 3 ** (self.level + 1)
+
+    @property
+    def capacity(self):
+        return 4 * 3 ** self.reach + 1
+
+    def node(self, x, y):
+        if x & y:
+            return 2 * _triangle(x - 1, y) + 1
+        return 2 * _triangle(x, y)
+
+    # Lattice coordinates (x, y) of a node, its distance from the origin corner is x + y
+    def coordinates(self, node):
+        x, y = _corner(node >> 1)
+        return x + (node & 1), y
+
+    # Ternary address of a node: the digits of its triangle from the largest
+    # scale down (`digits` of them, default the current level) and the corner
+    # of that triangle it sits on (0 lower, 1 along x, 2 along y)
+    def address(self, node, digits=None):
+        digits = self.level if digits is None else digits
+        t, corner = node >> 1, node & 1
+        if t >= 3 ** digits:
+            # An outer corner, named after the triangle below it
+            x, y = self.coordinates(node)
+            t, corner = (_triangle(x - 1, y), 1) if x else (_triangle(x, y - 1), 2)
+        return tuple(t // 3 ** k % 3 for k in range(digits - 1, -1, -1)), corner
+
+    # Node at a corner (0 lower, 1 along x, 2 along y) of the triangle with the given ternary address
+    def node_at(self, digits, corner=0):
+        t = 0
+        for digit in digits:
+            t = 3 * t + digit
+        x, y = _corner(t)
+        return self.node(x + (corner == 1), y + (corner == 2))
+
+    def _neighbor_list(self, x, y):
+        neighbors = []
+        # Triangles below the vertex first, the one above it is the only one a growing gasket adds
+        if x and not (x - 1) & y:
+            neighbors += [self.node(x - 1, y), self.node(x - 1, y + 1)]
+        if y and not x & (y - 1):
+            neighbors += [self.node(x, y - 1), self.node(x + 1, y - 1)]
+        if not x & y and x + y < self.size:
+            neighbors += [self.node(x + 1, y), self.node(x, y + 1)]
+        return neighbors
+
+    # Neighbors in a fixed order that growth only appends to, so move slots stay valid
+    def neighbors(self, node):
+        return np.array(self._neighbor_list(*self.coordinates(node)), dtype=np.int64)
+
+    def degree(self, node):
+        return len(self._neighbor_list(*self.coordinates(node)))
+
+    # Grow once `node` comes within `margin` steps of an outer corner: the distance
+    # to (2^n, 0) is 2^n - x and to (0, 2^n) is 2^n - y.  A fixed gasket only
+    # widens the range of ids its walks keep flags for.  Returns whether it grew.
+    def grow_towards(self, node, margin):
+        x, y = self.coordinates(node)
+        grown = False
+        while max(x, y) + margin >= 1 << self.reach and (self.lazy or self.reach < self.level):
+            self.reach += 1
+            grown = True
+        self.level = max(self.level, self.reach)
+        return grown
+
+    # Vectorized counterparts over arrays of nodes, for decoding and diameters
+    def nodes_at(self, x, y):
+        x, y = np.asarray(x, dtype=np.int64), np.asarray(y, dtype=np.int64)
+        upper = (x & y) != 0
+        x = x - upper
+        t = np.zeros(x.shape, dtype=np.int64)
+        scale = 1
+        while (x | y).any():
+            t += (_SPREAD[x & 255] + 2 * _SPREAD[y & 255]) * scale
+            x, y = x >> 8, y >> 8
+            scale *= _CHUNK
+        return 2 * t + upper
+
+    def coordinates_of(self, nodes):
+        nodes = np.asarray(nodes, dtype=np.int64)
+        t = nodes >> 1
+        x = np.zeros(nodes.shape, dtype=np.int64)
+        y = np.zeros(nodes.shape, dtype=np.int64)
+        shift = 0
+        while t.any():
+            t, chunk = np.divmod(t, _CHUNK)
+            x |= _X_BITS[chunk] << shift
+            y |= _Y_BITS[chunk] << shift
+            shift += 8
+        return x + (nodes & 1), y
+
+    # Cartesian positions of nodes on the equilateral gasket with unit edges
+    def positions_of(self, nodes):
+        x, y = self.coordinates_of(nodes)
+        return np.stack([x + y / 2, y * np.sqrt(3) / 2], axis=1)
+
+    # (n, 4) table of the neighbors of each node in neighbors() order, padded with -1
+    def neighbor_rows(self, nodes):
+        x, y = self.coordinates_of(nodes)
+        found = [(x > 0) & (((x - 1) & y) == 0),
+                 (y > 0) & ((x & (y - 1)) == 0),
+                 ((x & y) == 0) & (x + y < self.size)]
+        pairs = [(x - 1, y, x - 1, y + 1), (x, y - 1, x + 1, y - 1), (x + 1, y, x, y + 1)]
+        rows = np.full((len(x), 4), -1, dtype=np.int64)
+        filled = np.zeros(len(x), dtype=np.int64)
+        for mask, (x1, y1, x2, y2) in zip(found, pairs):
+            index = np.flatnonzero(mask)
+            column = filled[index]
+            rows[index, column] = self.nodes_at(x1[index], y1[index])
+            rows[index, column + 1] = self.nodes_at(x2[index], y2[index])
+            filled[index] += 2
+        return rows
+
+    # All nodes of the current level
+    def vertices(self):
+        t = np.arange(3 ** self.level, dtype=np.int64)
+        x, y = self.coordinates_of(2 * t)
+        # Corners along x that no triangle has as lower corner, and the two outer corners
+        upper = 2 * t[((x + 1) & y) != 0] + 1
+        outer = self.nodes_at([self.size, 0], [0, self.size])
+        return np.sort(np.concatenate([2 * t, upper, outer]))
+
+    # All edges of the current level, three per unit triangle
+    def edges(self):
+        t = np.arange(3 ** self.level, dtype=np.int64)
+        x, y = self.coordinates_of(2 * t)
+        corners = np.stack([2 * t, self.nodes_at(x + 1, y), self.nodes_at(x, y + 1)], axis=1)
+        return corners[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+
+    # Diameter of the subgraph induced by `nodes`, from their neighbor rows
+    def diameter(self, nodes):
+        nodes = np.unique(np.asarray(list(nodes) if isinstance(nodes, set) else nodes, dtype=np.int64))
+        return induced_diameter(nodes, self.neighbor_rows(nodes))
+
+    # Export the current level to networkx, only needed for plotting small gaskets
+    def to_networkx(self):
+        import networkx as nx
+
+        G = nx.Graph()
+        G.add_nodes_from(self.vertices().tolist())
+        G.add_edges_from(self.edges().tolist())
+        return G
+
+    def __len__(self):
+        return self.num_nodes
@@ -0,0 +1,284 @@
+import numpy as np
+
+# Compact adjacency-array graph used by the fractal random walks.
+# Every node owns one row of a padded int32 neighbor table, so a neighbor
+# lookup is a single slice instead of a walk through networkx's dict-of-dicts.
+# Directed graphs are restricted to rooted trees (at most one predecessor per
+# node), which is all the Sierpinski walk needs.
+class FractalGraph:
+    def __init__(self, max_degree=2, capacity=16, directed=False):
+        self.directed = directed
+        self.num_nodes = 0
+        self.coords = None # Lattice coordinates of the nodes, if the graph has a geometry
+        self.index = None # Coordinate -> node lookup matching coords
+        self.topology = "tree" if directed else None # "path", "lattice" or "tree" when known
+        self.adj = np.full((capacity, max_degree), -1, dtype=np.int32)
+        self.deg = np.zeros(capacity, dtype=np.int32)
+        if directed:
+            self.pred = np.full(capacity, -1, dtype=np.int32)
+            self.level = np.zeros(capacity, dtype=np.int32)
+
+    # Build a graph from arrays of edge endpoints in one vectorized pass
+    @classmethod
+    def from_edges(cls, sources, targets, num_nodes=None, directed=False):
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if num_nodes is None:
+            num_nodes = int(max(sources.max(initial=-1), targets.max(initial=-1))) + 1
+
+        # Drop self-loops and duplicate edges (networkx silently merges them too)
+        keep = sources != targets
+        sources, targets = sources[keep], targets[keep]
+        if not directed:
+            sources, targets = np.minimum(sources, targets), np.maximum(sources, targets)
+        keys = np.sort(sources * num_nodes + targets)
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])[:len(keys)]]
+        sources, targets = keys // num_nodes, keys % num_nodes
+
+        # Every edge is stored on both endpoints, directed trees also keep the predecessor
+        rows = np.concatenate([sources, targets])
+        cols = np.concatenate([targets, sources])
+        order = np.argsort(rows, kind="stable")
+        rows, cols = rows[order], cols[order]
+        deg = np.bincount(rows, minlength=num_nodes).astype(np.int32)
+        max_degree = max(int(deg.max(initial=0)), 1)
+
+        G = cls(max_degree=max_degree, capacity=max(num_nodes, 1), directed=directed)
+        starts = np.concatenate([[0], np.cumsum(deg)[:-1]])
+        slots = np.arange(len(rows)) - starts[rows]
+        G.adj[rows, slots] = cols
+        G.deg[:num_nodes] = deg
+        G.num_nodes = num_nodes
+        if directed:
+            if np.bincount(targets, minlength=num_nodes).max(initial=0) > 1:
+                raise ValueError("directed FractalGraph only supports trees")
+            G.pred[targets] = sources
+            G.level[:num_nodes] = _tree_levels(G.pred[:num_nodes])
+        return G
+
+    @property
+    def capacity(self):
+        return len(self.deg)
+
+    @property
+    def max_degree(self):
+        return self.adj.shape[1]
+
+    # Grow the node arrays geometrically so repeated extensions stay amortized O(1)
+    def reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+        new_capacity = max(capacity, 2 * self.capacity)
+        extra = new_capacity - self.capacity
+        self.adj = np.concatenate([self.adj, np.full((extra, self.max_degree), -1, dtype=np.int32)])
+        self.deg = np.concatenate([self.deg, np.zeros(extra, dtype=np.int32)])
+        if self.directed:
+            self.pred = np.concatenate([self.pred, np.full(extra, -1, dtype=np.int32)])
+            self.level = np.concatenate([self.level, np.zeros(extra, dtype=np.int32)])
+
+    def _widen(self, max_degree):
+        extra = max_degree - self.max_degree
+        self.adj = np.concatenate([self.adj, np.full((self.capacity, extra), -1, dtype=np.int32)], axis=1)
+
+    def add_node(self, node):
+        self.reserve(node + 1)
+        self.num_nodes = max(self.num_nodes, node + 1)
+
+    def has_edge(self, u, v):
+        if max(u, v) >= self.num_nodes:
+            return False
+        return bool((self.adj[u, :self.deg[u]] == v).any())
+
+    def add_edge(self, u, v):
+        if u == v or self.has_edge(u, v):
+            return
+        self.add_node(max(u, v))
+        if self.deg[u] == self.max_degree or self.deg[v] == self.max_degree:
+            self._widen(self.max_degree + 1)
+        self.adj[u, self.deg[u]] = v
+        self.deg[u] += 1
+        self.adj[v, self.deg[v]] = u
+        self.deg[v] += 1
+        if self.directed:
+            if self.pred[v] >= 0:
+                raise ValueError("directed FractalGraph only supports trees")
+            self.pred[v] = u
+            self.level[v] = self.level[u] + 1
+
+    def add_edges_from(self, edges):
+        for u, v in edges:
+            self.add_edge(int(u), int(v))
+
+    # Append undirected edges that are not in the graph yet, in one vectorized pass
+    def append_edges(self, sources, targets):
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if not len(sources):
+            return
+        self.add_node(int(max(sources.max(), targets.max())))
+        rows = np.concatenate([sources, targets])
+        cols = np.concatenate([targets, sources])
+        order = np.argsort(rows, kind="stable")
+        rows, cols = rows[order], cols[order]
+        # Slot of each new entry: current degree plus its rank among the new entries of that row
+        group_start = np.concatenate([[True], rows[1:] != rows[:-1]])
+        starts = np.flatnonzero(group_start)
+        rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.append(starts, len(rows))))
+        slots = self.deg[rows] + rank
+        if slots.max() >= self.max_degree:
+            self._widen(int(slots.max()) + 1)
+        self.adj[rows, slots] = cols
+        np.add.at(self.deg, rows, 1)
+
+    # Merge the edges of another graph into this one in place (replaces nx.compose)
+    def compose(self, other):
+        self.add_edges_from(other.edges())
+        self.add_node(other.num_nodes - 1)
+        if other.coords is not None and (self.coords is None or len(other.coords) > len(self.coords)):
+            self.coords, self.index = other.coords, other.index
+        return self
+
+    # All neighbors of a node (successors and predecessor for trees) as an int32 view
+    def neighbors(self, node):
+        return self.adj[node, :self.deg[node]]
+
+    def successors(self, node):
+        row = self.neighbors(node)
+        if self.directed:
+            return row[row != self.pred[node]]
+        return row
+
+    def predecessors(self, node):
+        if self.directed:
+            return self.pred[node:node + 1] if self.pred[node] >= 0 else self.pred[:0]
+        return self.neighbors(node)
+
+    def has_successors(self, node):
+        if self.directed:
+            return self.deg[node] > (self.pred[node] >= 0)
+        return self.deg[node] > 0
+
+    def number_of_edges(self):
+        return int(self.deg[:self.num_nodes].sum()) // 2
+
+    # Edge list with each edge once (parent -> child for trees)
+    def edges(self):
+        rows = np.repeat(np.arange(self.num_nodes), self.deg[:self.num_nodes])
+        mask = np.arange(self.max_degree) < self.deg[:self.num_nodes, None]
+        cols = self.adj[:self.num_nodes][mask]
+        if self.directed:
+            keep = self.pred[cols] == rows
+        else:
+            keep = rows < cols
+        return np.stack([rows[keep], cols[keep]], axis=1)
+
+    # Compressed sparse row view of the adjacency (indptr, indices)
+    def to_csr(self):
+        deg = self.deg[:self.num_nodes]
+        indptr = np.concatenate([[0], np.cumsum(deg)]).astype(np.int64)
+        mask = np.arange(self.max_degree) < deg[:, None]
+        return indptr, self.adj[:self.num_nodes][mask]
+
+    # Longest root-to-leaf path, the tree equivalent of nx.dag_longest_path_length
+    def longest_path_length(self):
+        if not self.directed:
+            raise ValueError("longest_path_length is only defined for directed trees")
+        return int(self.level[:self.num_nodes].max(initial=0))
+
+    # Breadth-first distances from a source, expanding whole frontiers as arrays.
+    # An optional boolean mask restricts the search to an induced subgraph.
+    def bfs_distances(self, source, mask=None):
+        dist = np.full(self.num_nodes, -1, dtype=np.int64)
+        dist[source] = 0
+        frontier = np.array([source], dtype=np.int64)
+        d = 0
+        while len(frontier):
+            d += 1
+            candidates = self.adj[frontier].ravel()
+            candidates = candidates[candidates >= 0]
+            candidates = candidates[dist[candidates] < 0]
+            if mask is not None:
+                candidates = candidates[mask[candidates]]
+            frontier = np.unique(candidates)
+            dist[frontier] = d
+        return dist
+
+    # Diameter of the subgraph induced by `nodes` (same result as nx.diameter)
+    def diameter(self, nodes):
+        nodes = np.asarray(list(nodes) if isinstance(nodes, set) else nodes, dtype=np.int64)
+        mask = np.zeros(self.num_nodes, dtype=bool)
+        mask[nodes] = True
+        dist = self.bfs_distances(int(nodes[0]), mask)[nodes]
+        if (dist < 0).any():
+            raise ValueError("Found infinite path length because the graph is not connected")
+
+        # A double sweep is exact on trees, which is what the path and tree walks visit
+        rows = self.adj[nodes]
+        sub_edges = int(mask[rows[rows >= 0]].sum()) // 2
+        if sub_edges == len(nodes) - 1:
+            far = int(nodes[np.argmax(dist)])
+            return int(self.bfs_distances(far, mask)[nodes].max())
+        return _bounding_diameter(lambda i: self.bfs_distances(int(nodes[i]), mask)[nodes], dist)
+
+    # Export to networkx, only needed for plotting
+    def to_networkx(self):
+        import networkx as nx
+
+        G = nx.DiGraph() if self.directed else nx.Graph()
+        G.add_nodes_from(range(self.num_nodes))
+        G.add_edges_from(self.edges().tolist())
+        return G
+
+    def __len__(self):
+        return self.num_nodes
+
+
+# Diameter of the subgraph on the sorted array `nodes` whose neighbor table is
+# `rows` (padded with -1), keeping only the edges between two of the nodes
+def induced_diameter(nodes, rows):
+    local = np.minimum(np.searchsorted(nodes, rows), len(nodes) - 1)
+    inside = (rows >= 0) & (nodes[local] == rows)
+    sources = np.broadcast_to(np.arange(len(nodes))[:, None], rows.shape)[inside]
+    subgraph = FractalGraph.from_edges(sources, local[inside], num_nodes=len(nodes))
+    return subgraph.diameter(np.arange(len(nodes)))
+
+# Distance of every node from its root, following all predecessor chains in lockstep
+def _tree_levels(pred):
+    level = np.zeros(len(pred), dtype=np.int32)
+    current = pred.astype(np.int64)
+    while (current >= 0).any():
+        level[current >= 0] += 1
+        current = np.where(current >= 0, pred[np.maximum(current, 0)], -1)
+    return level
+
+# Exact diameter from a few BFS sweeps (Takes & Kosters, "Determining the diameter
+# of small world networks").  Every sweep tightens lower and upper bounds on the
+# eccentricity of all nodes, nodes whose bounds can no longer change the answer are
+# dropped, and the search stops once the diameter bounds meet.
+def _bounding_diameter(sweep, first_sweep):
+    n = len(first_sweep)
+    ecc_lower = np.zeros(n, dtype=np.int64)
+    ecc_upper = np.full(n, np.iinfo(np.int64).max)
+    candidates = np.ones(n, dtype=bool)
+    lower, upper = 0, np.iinfo(np.int64).max
+    dist = first_sweep
+    source = 0
+    pick_upper = True
+    while True:
+        ecc = int(dist.max())
+        ecc_lower = np.maximum(ecc_lower, np.maximum(dist, ecc - dist))
+        ecc_upper = np.minimum(ecc_upper, ecc + dist)
+        ecc_lower[source] = ecc_upper[source] = ecc
+        lower = max(lower, int(ecc_lower.max()))
+        upper = min(upper, 2 * ecc, int(ecc_upper.max()))
+        candidates &= ~(((ecc_upper <= lower) & (2 * ecc_lower >= upper)) | (ecc_lower == ecc_upper))
+        if lower == upper or not candidates.any():
+            return lower
+
+        # Alternate between the most promising upper and lower bound candidates
+        if pick_upper:
+            source = int(np.argmax(np.where(candidates, ecc_upper, -1)))
+        else:
+            source = int(np.argmin(np.where(candidates, ecc_lower, np.iinfo(np.int64).max)))
+        pick_upper = not pick_upper
+        dist = sweep(source)
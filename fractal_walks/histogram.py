@@ -0,0 +1,192 @@
+import numpy as np
+
+# Fixed-memory histogram of walk depths with a binned KDE.  Values are counted
+# into equal-width bins, never stored, so memory is bounded by `max_bins` and
+# not by the number of samples.  When a value falls beyond the last bin that
+# fits, the bin width doubles and neighbouring bins are summed, so the histogram
+# never grows past max_bins whatever the range of the data.  Exact count, sum and
+# sum of squares are kept next to the bins for the mean and the KDE bandwidth.
+#
+#   hist = DepthHistogram()
+#   hist.add(depths)                  # any number of times, arrays or scalars
+#   hist.merge(other)                 # e.g. the histogram of a worker or of another run
+#   x, density = hist.kde()
+#
+# The default bins have width 1 and are centered on the integers (low=-0.5), so
+# integer depths are binned exactly.  Histograms with the same `low` and base
+# `width` merge in any order; the finer one is coarsened to the wider bins first.
+
+class DepthHistogram:
+    def __init__(self, low=-0.5, width=1, max_bins=1 << 16):
+        self.low = float(low)
+        self.base_width = float(width)
+        self.width = float(width)
+        self.max_bins = max_bins
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    # An empty histogram with the same bins, e.g. for a worker process
+    def empty(self):
+        return DepthHistogram(self.low, self.base_width, self.max_bins)
+
+    # Double the bin width until `bins` bins fit into max_bins
+    def _coarsen(self, bins):
+        while bins > self.max_bins:
+            self._double()
+            bins = (bins + 1) // 2
+
+    def _double(self):
+        self.counts = _sum_pairs(self.counts)
+        self.width *= 2
+
+    def _grow(self, bins):
+        if bins > len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros(bins - len(self.counts), dtype=np.int64)])
+
+    # Count an array of values (or a single value)
+    def add(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if not len(values):
+            return self
+        lowest, highest = values.min(), values.max()
+        if lowest < self.low:
+            raise ValueError(f"value {lowest} is below the histogram range starting at {self.low}")
+        self._coarsen(int((highest - self.low) // self.width) + 1)
+        bins = ((values - self.low) // self.width).astype(np.int64)
+        counts = np.bincount(bins)
+        self._grow(len(counts))
+        self.counts[:len(counts)] += counts
+        self.n += len(values)
+        self.total += float(values.sum())
+        self.total_sq += float(np.dot(values, values))
+        self.min = min(self.min, float(lowest))
+        self.max = max(self.max, float(highest))
+        return self
+
+    # Add the counts of another histogram with the same low and base width
+    def merge(self, other):
+        if (other.low, other.base_width) != (self.low, self.base_width):
+            raise ValueError("histograms with different bins cannot be merged, low and width must match")
+        counts = other.counts
+        width = other.width
+        # Bring both to the wider of the two bin widths
+        while self.width < width:
+            self._double()
+        self._coarsen(int(-(-len(counts) * width // self.width)))
+        while width < self.width:
+            counts = _sum_pairs(counts)
+            width *= 2
+        self._grow(len(counts))
+        self.counts[:len(counts)] += counts
+        self.n += other.n
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def edges(self):
+        return self.low + self.width * np.arange(len(self.counts) + 1)
+
+    @property
+    def centers(self):
+        return self.low + self.width * (np.arange(len(self.counts)) + 0.5)
+
+    @property
+    def mean(self):
+        return self.total / self.n if self.n else np.nan
+
+    # Sample variance (ddof=1) from the exact sums
+    @property
+    def var(self):
+        if self.n < 2:
+            return np.nan
+        return max(self.total_sq - self.total * self.mean, 0.0) / (self.n - 1)
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.var))
+
+    # Gaussian KDE bandwidth in data units: "scott" or "silverman" as in
+    # scipy.stats.gaussian_kde (and so seaborn.kdeplot), or a number
+    def bandwidth(self, method="scott"):
+        if method == "scott":
+            return self.std * self.n ** -0.2
+        if method == "silverman":
+            return self.std * (self.n * 3 / 4) ** -0.2
+        return float(method)
+
+    # Binned Gaussian KDE: the bin counts are convolved with the kernel sampled on
+    # the bin grid by FFT, O(bins log bins) whatever the number of samples.  The
+    # grid runs `cut` bandwidths past the extreme bins, like seaborn's kdeplot.
+    # Returns (x, density) with the density integrating to 1.
+    def kde(self, bandwidth="scott", cut=3):
+        if self.n < 2:
+            raise ValueError("a KDE needs at least two values")
+        bw = self.bandwidth(bandwidth)
+        if not bw > 0:
+            raise ValueError("the bandwidth is zero, all values fall into one bin")
+        first = int((self.min - self.low) // self.width)
+        last = int((self.max - self.low) // self.width) + 1
+        counts = self.counts[first:last]
+        pad = int(np.ceil(cut * bw / self.width))
+        size = len(counts) + 2 * pad
+        fft_size = 1 << (size + 2 * pad - 1).bit_length()
+        offsets = np.arange(-pad, pad + 1)
+        kernel = np.exp(-0.5 * (offsets * self.width / bw) ** 2)
+        # Kernel centered on index 0 of the circular buffer, the padding keeps it from wrapping onto the data
+        wrapped = np.zeros(fft_size)
+        wrapped[offsets % fft_size] = kernel
+        signal = np.zeros(fft_size)
+        signal[pad:pad + len(counts)] = counts
+        smooth = np.fft.irfft(np.fft.rfft(signal) * np.fft.rfft(wrapped), fft_size)[:size]
+        density = np.maximum(smooth, 0) / (self.n * bw * np.sqrt(2 * np.pi))
+        x = self.low + self.width * (np.arange(first - pad, last + pad) + 0.5)
+        return x, density
+
+    def save(self, filename):
+        np.savez(filename, counts=self.counts, params=[self.low, self.base_width, self.width, self.max_bins],
+                 sums=[self.n, self.total, self.total_sq, self.min, self.max])
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as data:
+            low, base_width, width, max_bins = data["params"]
+            hist = cls(low, base_width, int(max_bins))
+            hist.width = float(width)
+            hist.counts = data["counts"].astype(np.int64)
+            n, hist.total, hist.total_sq, hist.min, hist.max = (float(v) for v in data["sums"])
+            hist.n = int(n)
+        return hist
+
+# Sum neighbouring bins, halving the number of bins
+def _sum_pairs(counts):
+    if len(counts) % 2:
+        counts = np.append(counts, 0)
+    return counts.reshape(-1, 2).sum(axis=1)
+
+# Draw a DepthHistogram as bars over `bins` (display bins, default the histogram's
+# own) with its KDE on top, scaled to counts per bin like the bars.  The display
+# bins are filled from the stored counts, so no raw samples are needed.  With
+# uneven bins the KDE is scaled by the width of the first one.
+# Returns the bar heights and bin edges like plt.hist.
+def plot_histogram(hist, bins=None, ax=None, kde=True, bandwidth="scott", label="Histogram", kde_label="KDE",
+                   kde_color="red", **hist_kwargs):
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        ax = plt.gca()
+    if bins is None:
+        bins = hist.edges
+    options = dict(edgecolor="black", alpha=0.7, rwidth=0.9, label=label)
+    options.update(hist_kwargs)
+    freq, edges, _ = ax.hist(hist.centers, bins=bins, weights=hist.counts, **options)
+    if kde:
+        x, density = hist.kde(bandwidth)
+        ax.plot(x, density * hist.n * (edges[1] - edges[0]), color=kde_color, linewidth=2, label=kde_label)
+    return freq, edges
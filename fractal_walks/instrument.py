@@ -0,0 +1,67 @@
+import time
+
+# Per-phase timers and event counters for the walk functions.  A walk only
+# measures anything when it is given a WalkStats as `stats`; without one every
+# hook is a single `is not None` test, so uninstrumented runs pay next to nothing.
+#
+#   stats = WalkStats()
+#   move_and_extend_dragon(0, G, 10000, 3, stats=stats)
+#   print(stats.report())
+#
+# Timers work like laps: lap(phase) charges the time since the previous lap to
+# `phase`, so a walk calls it once at the end of every phase of a step.  Stats
+# of separate walks and worker processes add up with merge(), run_walks does
+# this when it is given a WalkStats.
+
+# Phases of one step, in the order they are reported
+PHASES = ("setup", "extension", "neighbors", "weights", "choice", "depth")
+
+# Counters reported for every run
+COUNTERS = ("walks", "steps", "extensions", "nodes_added", "distinct_nodes", "backtracks")
+
+class WalkStats:
+    def __init__(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self._last = time.perf_counter()
+
+    # Start timing a new walk
+    def start(self):
+        self.counts["walks"] += 1
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.times[phase] += now - self._last
+        self._last = now
+
+    def count(self, counter, amount=1):
+        self.counts[counter] = self.counts.get(counter, 0) + amount
+
+    # Add the timers and counters of another WalkStats, e.g. from a worker process
+    def merge(self, other):
+        for phase, seconds in other.times.items():
+            self.times[phase] = self.times.get(phase, 0.0) + seconds
+        for counter, value in other.counts.items():
+            self.count(counter, value)
+        return self
+
+    def as_dict(self):
+        return {"times": dict(self.times), "counts": dict(self.counts)}
+
+    # Text summary: time per phase with its share and cost per step, then the
+    # counters in total and per walk
+    def report(self):
+        total = sum(self.times.values())
+        steps = max(self.counts["steps"], 1)
+        walks = max(self.counts["walks"], 1)
+        lines = [f"{'phase':12s} {'seconds':>10s} {'share':>7s} {'per step':>10s}"]
+        for phase, seconds in self.times.items():
+            share = seconds / total if total else 0.0
+            lines.append(f"{phase:12s} {seconds:10.4f} {share:7.1%} {seconds / steps * 1e9:8.0f}ns")
+        lines.append(f"{'total':12s} {total:10.4f} {1:7.1%} {total / steps * 1e9:8.0f}ns")
+        lines.append("")
+        lines.append(f"{'counter':16s} {'total':>12s} {'per walk':>12s}")
+        for counter, value in self.counts.items():
+            lines.append(f"{counter:16s} {value:12d} {value / walks:12.2f}")
+        return "\n".join(lines)
@@ -0,0 +1,322 @@
+import importlib.util
+import random
+from functools import partial
+
+import numpy as np
+
+from .dragon import generate_dragon_curve, dragon_curve_to_graph, LazyDragonGraph
+from .paths import _pairs, encode_nodes
+from .sampling import transition_table
+from .walks import Horizons, move_and_extend_dragon, move_and_extend
+
+# Compiled step kernels for long single walks.  The step rules of
+# move_and_extend_dragon and move_and_extend are written once as loops over the
+# graph's int32 adjacency arrays and a uint8 visited bitmap.  When Numba is
+# importable they are compiled with numba.njit.  Without it (or with jit=False)
+# the Dragon Curve walk runs move_and_extend_dragon, which is faster than the
+# kernel loop interpreted over NumPy scalars, and the tree walk runs its kernel
+# as plain Python, which is faster than move_and_extend.  Both draw the same
+# uniforms as the compiled kernels, so results do not depend on which one runs.
+# The Python drivers below feed the
+# kernels blocks of uniform random numbers and take over whenever the graph has
+# to grow or a horizon is reached, so the kernels themselves never allocate.
+#
+# Both kernels use exactly one uniform per step and make the same choice as the
+# sequential walks would for that uniform, which is what verify_kernels checks:
+# compiled kernels, interpreted kernels and the sequential walks replaying the
+# same uniforms must produce identical paths, depths and graphs.
+
+# Numba is only imported when the kernels are first compiled
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None
+
+# Uniforms generated per block
+_BLOCK = 1 << 16
+
+# Kernel return codes: ran out of uniforms, needs the graph to grow, no neighbors
+_DONE, _GROW, _STUCK = 0, 1, 2
+
+# Biased Dragon Curve steps: the cumulative weights for the visited flags of the
+# neighbors come from the arrays of a TransitionTable, and the first neighbor
+# whose cumulative weight exceeds u * total is taken (the rule of
+# random.choices).  Stops before a step from a node at or past grow_at.
+# Returns (code, steps taken, current node, lowest, highest).
+def _dragon_steps(adj, deg, visited, cumulative, totals, uniforms, nodes, offset, current, grow_at, lowest,
+                  highest):
+    taken = 0
+    for i in range(len(uniforms)):
+        if current >= grow_at:
+            return _GROW, taken, current, lowest, highest
+        n = deg[current]
+        if n == 0:
+            return _STUCK, taken, current, lowest, highest
+        key = 1 << n
+        for k in range(n):
+            if visited[adj[current, k]]:
+                key |= 1 << k
+        x = uniforms[i] * totals[key]
+        chosen = adj[current, n - 1]
+        for k in range(n - 1):
+            if x < cumulative[key, k]:
+                chosen = adj[current, k]
+                break
+        current = chosen
+        visited[current] = 1
+        if current < lowest:
+            lowest = current
+        elif current > highest:
+            highest = current
+        if len(nodes):
+            nodes[offset + taken] = current
+        taken += 1
+    return _DONE, taken, current, lowest, highest
+
+# Unbiased tree steps: uniform among the neighbors of the node before it is
+# extended, so a leaf always steps back to its parent while it gets b children
+# for the next visit.  New children are appended to the adjacency arrays in place,
+# stopping when they would not fit.  Returns (code, steps taken, current node,
+# number of nodes, longest path).
+def _tree_steps(adj, deg, pred, level, uniforms, nodes, offset, current, num_nodes, depth, b, extend):
+    taken = 0
+    capacity = len(deg)
+    for i in range(len(uniforms)):
+        n = deg[current]
+        if n == 0:
+            return _STUCK, taken, current, num_nodes, depth
+        leaf = n == (1 if pred[current] >= 0 else 0)
+        if leaf and extend:
+            if num_nodes + b > capacity:
+                return _GROW, taken, current, num_nodes, depth
+            for k in range(b):
+                child = num_nodes + k
+                adj[current, deg[current]] = child
+                deg[current] += 1
+                adj[child, 0] = current
+                deg[child] = 1
+                pred[child] = current
+                level[child] = level[current] + 1
+            num_nodes += b
+            if level[current] + 1 > depth:
+                depth = level[current] + 1
+        current = adj[current, int(uniforms[i] * n)]
+        if len(nodes):
+            nodes[offset + taken] = current
+        taken += 1
+    return _DONE, taken, current, num_nodes, depth
+
+_python_kernels = (_dragon_steps, _tree_steps)
+_compiled_kernels = None
+
+# The kernels to run: compiled when Numba is available and jit is not False
+def _kernels(jit):
+    global _compiled_kernels
+    if jit is None:
+        jit = HAVE_NUMBA
+    if not jit:
+        return _python_kernels
+    if not HAVE_NUMBA:
+        raise ImportError("jit=True needs numba")
+    if _compiled_kernels is None:
+        import numba
+        _compiled_kernels = tuple(numba.njit(cache=True, nogil=True)(kernel) for kernel in _python_kernels)
+    return _compiled_kernels
+
+# Blocks of uniforms from a numpy Generator, consumed across kernel calls
+class _Uniforms:
+    def __init__(self, rng):
+        self.rng = rng
+        self.block = np.empty(0)
+        self.offset = 0
+
+    def take(self, count):
+        if self.offset == len(self.block):
+            self.block = self.rng.random(_BLOCK)
+            self.offset = 0
+        return self.block[self.offset:self.offset + count]
+
+    def consume(self, count):
+        self.offset += count
+
+# The recorded nodes in the requested record_path mode: True and "nodes" give the
+# (n, 2) view of the steps, "moves" encodes them once the walk is done
+def _kernel_path(nodes, G, record_path):
+    if not record_path:
+        return None
+    if record_path == "moves":
+        return encode_nodes(nodes, G)
+    return _pairs(nodes)
+
+# Run kernel segments until `steps` are taken, stopping at every horizon to record
+# the depth.  `run(uniforms, offset)` runs one segment and returns (code, taken).
+def _drive(run, steps, horizons, depth, uniforms):
+    step = 0
+    if horizons.next == 0:
+        horizons.record(depth())
+    while step < steps:
+        target = horizons.next if 0 <= horizons.next < steps else steps
+        code, taken = run(uniforms.take(target - step), step)
+        uniforms.consume(taken)
+        step += taken
+        if step == horizons.next:
+            horizons.record(depth())
+        if code == _STUCK:
+            break
+    return step
+
+# move_and_extend_dragon on the compiled kernel.  Returns (path, depth, G) like
+# the sequential walk, with the path as an (n, 2) int32 array, an EncodedPath
+# with record_path="moves" (encoded after the walk, the kernel itself always
+# keeps 4 bytes per step) or None when record_path is False, which keeps memory
+# independent of the walk length.
+# `rng` is a numpy Generator or a seed.
+def kernel_move_and_extend_dragon(start_node, G, steps, iterations_to_extend, rng=None, horizons=None,
+                                  record_path=True, jit=None, transitions=None):
+    if not (HAVE_NUMBA if jit is None else jit):
+        # The sequential walk takes one uniform per step from the same blocks of the generator
+        return move_and_extend_dragon(start_node, G, steps, iterations_to_extend, rng=np.random.default_rng(rng),
+                                      horizons=horizons, record_path="nodes" if record_path is True else record_path,
+                                      transitions=transitions)
+    return _dragon_kernel(_kernels(True)[0], start_node, G, steps, iterations_to_extend, rng, horizons, record_path,
+                          transitions)
+
+def _dragon_kernel(dragon_steps, start_node, G, steps, iterations_to_extend, rng, horizons, record_path, transitions):
+    table = transition_table(transitions)
+    uniforms = _Uniforms(np.random.default_rng(rng))
+    horizons = Horizons(steps, horizons)
+    steps = horizons.steps
+    lazy = isinstance(G, LazyDragonGraph)
+    margin = 2 ** iterations_to_extend
+
+    # A fixed graph smaller than one extension curve is extended on the first step
+    if not lazy and G.num_nodes < margin + 1 and steps > 0 and G.deg[start_node]:
+        G.compose(dragon_curve_to_graph(generate_dragon_curve(iterations_to_extend), lattice=G.coords is not None))
+
+    nodes = np.empty(steps + 1 if record_path else 0, dtype=np.int32)
+    if record_path:
+        nodes[0] = start_node
+    state = {"current": start_node, "lowest": start_node, "highest": start_node,
+             "visited": np.zeros(G.capacity, dtype=np.uint8)}
+    state["visited"][start_node] = 1
+
+    def run(block, offset):
+        visited = state["visited"]
+        grow_at = G.num_nodes - 1 - margin if lazy else np.iinfo(np.int64).max
+        code, taken, state["current"], state["lowest"], state["highest"] = dragon_steps(
+            G.adj, G.deg, visited, table.cumulative, table.totals, block, nodes[1:], offset, state["current"],
+            grow_at, state["lowest"], state["highest"])
+        if code == _GROW:
+            G.grow_towards(state["current"], margin)
+            state["visited"] = np.concatenate([visited, np.zeros(G.capacity - len(visited), dtype=np.uint8)])
+        return code, taken
+
+    def depth():
+        if G.topology == "path":
+            return int(state["highest"] - state["lowest"])
+        return G.diameter(np.flatnonzero(state["visited"][:G.num_nodes]))
+
+    taken = _drive(run, steps, horizons, depth, uniforms)
+    return _kernel_path(nodes[:taken + 1], G, record_path), horizons.result(depth()), G
+
+# move_and_extend on the compiled kernel, extending the FractalGraph tree G in
+# place exactly like extend_graph_from_node.  Returns (path, depths).
+def kernel_move_and_extend(start_node, G, steps=100, depth_to_extend=2, branching_factor=3, rng=None,
+                           horizons=None, record_path=True, jit=None):
+    _, tree_steps = _kernels(jit)
+    uniforms = _Uniforms(np.random.default_rng(rng))
+    horizons = Horizons(steps, horizons)
+    steps = horizons.steps
+    b = branching_factor
+    if G.max_degree < b + 1:
+        G._widen(b + 1)
+
+    nodes = np.empty(steps + 1 if record_path else 0, dtype=np.int32)
+    if record_path:
+        nodes[0] = start_node
+    state = {"current": start_node, "depth": G.longest_path_length()}
+
+    def run(block, offset):
+        code, taken, state["current"], G.num_nodes, state["depth"] = tree_steps(
+            G.adj, G.deg, G.pred, G.level, block, nodes[1:], offset, state["current"], G.num_nodes,
+            state["depth"], b, depth_to_extend > 0)
+        if code == _GROW:
+            G.reserve(G.num_nodes + b)
+        return code, taken
+
+    taken = _drive(run, steps, horizons, lambda: int(state["depth"]), uniforms)
+    return _kernel_path(nodes[:taken + 1], G, record_path), horizons.result([int(state["depth"])])
+
+
+# random.Random that replays given uniforms, for running the sequential walks on
+# the same random numbers as the kernels
+class _Replay(random.Random):
+    def __init__(self, uniforms):
+        super().__init__()
+        self.uniforms = iter(uniforms.tolist())
+
+    def random(self):
+        return next(self.uniforms)
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+def _same_graph(G, H):
+    n = G.num_nodes
+    width = int(G.deg[:n].max(initial=0))
+    return (n == H.num_nodes and np.array_equal(G.deg[:n], H.deg[:n])
+            and np.array_equal(G.adj[:n, :width], H.adj[:n, :width]))
+
+# Cross-check the kernels: for every configuration the compiled kernels (when
+# Numba is available), the interpreted kernels and the sequential walks replaying
+# the same uniforms must agree on the path, the depths and the final graph.
+# Raises AssertionError on the first mismatch and returns the checked paths.
+def verify_kernels(steps=5000, seed=0):
+    from .tree import create_tree_graph
+
+    horizons = [0, 1, steps // 3, steps]
+    dragon_cases = {
+        "path": lambda: dragon_curve_to_graph(generate_dragon_curve(9)),
+        "lattice": lambda: dragon_curve_to_graph(generate_dragon_curve(9), lattice=True),
+        "small path": lambda: dragon_curve_to_graph(generate_dragon_curve(2)),
+        "lazy path": lambda: LazyDragonGraph(3),
+        "lazy lattice": lambda: LazyDragonGraph(3, lattice=True),
+        "lattice 5:1": lambda: dragon_curve_to_graph(generate_dragon_curve(9), lattice=True),
+    }
+    modes = [False, True] if HAVE_NUMBA else [False]
+    # The Dragon Curve kernel is checked interpreted as well, jit=False runs the sequential walk
+    dragon_runs = {"interpreted": partial(_dragon_kernel, _python_kernels[0])}
+    for jit in modes:
+        dragon_runs[f"jit={jit}"] = partial(kernel_move_and_extend_dragon, jit=jit)
+    checked = []
+    for name, make_graph in dragon_cases.items():
+        transitions = 5 if name.endswith("5:1") else None
+        reference_path, reference_depths, reference_graph = move_and_extend_dragon(
+            0, make_graph(), steps, 3, rng=_Replay(np.random.default_rng(seed).random(steps)), horizons=horizons,
+            transitions=transitions)
+        for mode, run in dragon_runs.items():
+            path, depths, G = run(0, make_graph(), steps, 3, rng=seed, horizons=horizons, record_path=True,
+                                  transitions=transitions)
+            if path.tolist() != [list(step) for step in reference_path] or depths != reference_depths:
+                raise AssertionError(f"dragon kernel ({name}, {mode}) differs from move_and_extend_dragon")
+            if not _same_graph(G, reference_graph):
+                raise AssertionError(f"dragon kernel ({name}, {mode}) grew a different graph")
+        checked.append(f"dragon {name}")
+
+    for depth, depth_to_extend in [(2, 2), (0, 2), (3, 0)]:
+        reference_graph, _ = create_tree_graph(depth, 3)
+        reference_path, reference_depths = move_and_extend(
+            0, reference_graph, steps, depth_to_extend, 3, rng=_Replay(np.random.default_rng(seed).random(steps)),
+            horizons=horizons)
+        for jit in modes:
+            G, _ = create_tree_graph(depth, 3)
+            path, depths = kernel_move_and_extend(0, G, steps, depth_to_extend, 3, rng=seed, horizons=horizons,
+                                                  jit=jit)
+            if path.tolist() != [list(step) for step in reference_path] or depths != reference_depths:
+                raise AssertionError(f"tree kernel (depth {depth}, jit={jit}) differs from move_and_extend")
+            if not _same_graph(G, reference_graph):
+                raise AssertionError(f"tree kernel (depth {depth}, jit={jit}) grew a different graph")
+        checked.append(f"tree depth={depth} depth_to_extend={depth_to_extend}")
+    return checked
+
+if __name__ == "__main__":
+    for case in verify_kernels():
+        print(f"ok  {case}")
+    print("compiled kernels checked" if HAVE_NUMBA else "numba not installed, interpreted kernels checked")
@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from .instrument import WalkStats
+
+# Process-pool driver for the Monte Carlo loops.  Every walk gets its own
+# random.Random stream spawned from one master seed, so a run is reproducible
+# and gives the same results whatever the number of worker processes.
+
+# Spawn one independent 64-bit seed per walk from the master seed.  Walk i always
+# gets the i-th child of the master SeedSequence, so a run can be resumed at any
+# walk index with `offset` and still reproduce the seeds of an uninterrupted run.
+def spawn_seeds(seed, n_walks, offset=0):
+    entropy = np.random.SeedSequence(seed).entropy
+    children = (np.random.SeedSequence(entropy, spawn_key=(i,)) for i in range(offset, offset + n_walks))
+    return [int(child.generate_state(1, np.uint64)[0]) for child in children]
+
+# Number of worker processes to use when none is given.  Respects the CPU affinity
+# set by the cluster scheduler where it is available.
+def default_processes():
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+
+# Run one chunk of walks inside a worker, with the chunk's WalkStats when instrumented.
+# With a histogram the results are counted into it instead of being returned.
+def _run_chunk(task):
+    walk, make_graph, start_node, walk_args, walk_kwargs, extract, seeds, instrumented, histogram = task
+    results = []
+    stats = WalkStats() if instrumented else None
+    # Without a pool every chunk gets the same template, each counts into its own copy
+    histogram = None if histogram is None else histogram.empty()
+    if instrumented:
+        walk_kwargs = dict(walk_kwargs, stats=stats)
+    for seed in seeds:
+        G = make_graph()
+        # create_tree_graph returns (graph, max_id), only the graph is walked on
+        if isinstance(G, tuple):
+            G = G[0]
+        result = walk(start_node, G, *walk_args, rng=random.Random(seed), **walk_kwargs)
+        result = result if extract is None else extract(result)
+        if histogram is not None:
+            histogram.add(result)
+        else:
+            results.append(result)
+    return results, stats, histogram
+
+# Run n_walks independent walks of `walk` (move_and_extend_dragon, move_and_extend, ...)
+# across a process pool and return their results in walk order.
+#   make_graph: picklable callable building the initial graph of one walk
+#   extract:    optional picklable callable reducing a walk result before it is
+#               sent back to the parent, e.g. operator.itemgetter(1) for the depth
+#   offset:     index of the first walk, to continue an interrupted run
+#   stats:      optional instrument.WalkStats, the walks are instrumented and the
+#               stats of all workers are merged into it
+#   histogram:  optional histogram.DepthHistogram, the (extracted) results are
+#               counted into it inside the workers and run_walks returns it
+#               instead of the results, so no result list is ever held
+#   pool:       optional multiprocessing.Pool to run in, so that callers running
+#               many small batches start the workers only once
+def run_walks(walk, make_graph, n_walks, walk_args=(), walk_kwargs=None, start_node=0,
+              extract=None, seed=None, processes=None, chunksize=None, offset=0, stats=None, histogram=None,
+              pool=None):
+    chunks = _run_chunks(walk, make_graph, n_walks, walk_args, walk_kwargs, start_node, extract, seed, processes,
+                         chunksize, offset, stats is not None, histogram, pool)
+    return _collect(chunks, stats, histogram)
+
+# Run walks like run_walks, but yield the results of every chunk of `chunksize` walks
+# as soon as the chunk is done, in walk order, so a caller can save them while the
+# run goes on instead of waiting for all n_walks.
+def iter_walks(walk, make_graph, n_walks, walk_args=(), walk_kwargs=None, start_node=0,
+               extract=None, seed=None, processes=None, chunksize=None, offset=0, stats=None, pool=None):
+    for chunk, chunk_stats, _ in _run_chunks(walk, make_graph, n_walks, walk_args, walk_kwargs, start_node, extract,
+                                             seed, processes, chunksize, offset, stats is not None, None, pool):
+        if stats is not None:
+            stats.merge(chunk_stats)
+        yield chunk
+
+def _run_chunks(walk, make_graph, n_walks, walk_args, walk_kwargs, start_node, extract, seed, processes,
+                chunksize, offset, instrumented, histogram, pool):
+    walk_kwargs = {} if walk_kwargs is None else walk_kwargs
+    seeds = spawn_seeds(seed, n_walks, offset)
+    if processes is None:
+        processes = default_processes()
+    if chunksize is None:
+        chunksize = max(1, n_walks // (4 * processes))
+
+    empty = None if histogram is None else histogram.empty()
+    tasks = [(walk, make_graph, start_node, walk_args, walk_kwargs, extract, seeds[i:i + chunksize], instrumented,
+              empty) for i in range(0, n_walks, chunksize)]
+    if pool is not None:
+        yield from pool.imap(_run_chunk, tasks)
+        return
+    if processes == 1:
+        yield from map(_run_chunk, tasks)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        # imap keeps the chunks in submission order
+        yield from pool.imap(_run_chunk, tasks)
+
+def _collect(chunks, stats, histogram):
+    results = []
+    for chunk, chunk_stats, chunk_histogram in chunks:
+        results.extend(chunk)
+        if stats is not None:
+            stats.merge(chunk_stats)
+        if histogram is not None:
+            histogram.merge(chunk_histogram)
+    return results if histogram is None else histogram
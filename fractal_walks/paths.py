@@ -0,0 +1,197 @@
+import array
+
+import numpy as np
+
+# Path recording for the walks.  A walk keeps its path in one of these modes,
+# chosen with `record_path`:
+#   True      a list of (current_node, next_node) tuples, the default
+#   "nodes"   the visited nodes in an int32 array, returned as an (n, 2) view of
+#             consecutive pairs (4 bytes per step)
+#   "moves"   an EncodedPath: one move symbol per step, packed into as few bits as
+#             the walk needs (1 bit on the Dragon Curve path, 2 on its lattice and
+#             on 3-ary trees)
+#   False     no path at all, the walk returns None in its place
+# A 10^7-step walk takes about 1 GB as tuples, 40 MB as nodes and 1.2 MB as
+# moves.  decode_path turns any of them back into an (n, 2) array of steps, e.g.
+# for render_walk.
+#
+# Move symbols are slots in the neighbor rows of the graph (G.adj).  Rows only
+# ever grow at the end, so a slot still names the same neighbor in the final
+# graph and the path is decoded from the graph the walk returns.  On the path
+# topology a move is +1 or -1 along the curve, decoded without the graph; on an
+# ImplicitTree it is the child index, or b for the parent.  A SierpinskiGasket has
+# no rows, its moves are slots in the neighbor order it computes, which growing
+# the gasket only appends to as well.
+
+PATH_MODES = (True, "nodes", "moves", False)
+
+# (n, 2) read-only view of consecutive node pairs, the path without a copy
+def _pairs(nodes):
+    nodes = np.ascontiguousarray(nodes)
+    pairs = np.lib.stride_tricks.as_strided(nodes, shape=(max(len(nodes) - 1, 0), 2),
+                                            strides=(nodes.strides[0], nodes.strides[0]))
+    pairs.flags.writeable = False
+    return pairs
+
+class _TuplePath:
+    def __init__(self, start_node):
+        self.path = []
+
+    def add(self, node, next_node, move):
+        self.path.append((node, next_node))
+
+    def result(self):
+        return self.path
+
+class _NodePath:
+    def __init__(self, start_node):
+        self.nodes = array.array("i", [start_node])
+
+    def add(self, node, next_node, move):
+        self.nodes.append(next_node)
+
+    def result(self):
+        return _pairs(np.frombuffer(self.nodes, dtype=np.int32))
+
+# Moves given as the list of neighbors the walker chose from, stored as the slot of the next node
+class _SlotMoves:
+    kind = "slots"
+
+    def __init__(self, start_node, branching_factor=None):
+        self.start_node = start_node
+        self.branching_factor = branching_factor
+        self.symbols = bytearray()
+
+    def add(self, node, next_node, neighbors):
+        self.symbols.append(neighbors.index(next_node))
+
+    def result(self):
+        return EncodedPath(self.kind, self.start_node, np.frombuffer(self.symbols, dtype=np.uint8),
+                           self.branching_factor)
+
+class _PathMoves(_SlotMoves):
+    kind = "path"
+
+    def add(self, node, next_node, neighbors):
+        self.symbols.append(next_node > node)
+
+class _GasketMoves(_SlotMoves):
+    kind = "gasket"
+
+# Moves given directly as the symbol, for walks that compute their neighbors
+class _SymbolMoves(_SlotMoves):
+    kind = "implicit"
+
+    def add(self, node, next_node, symbol):
+        self.symbols.append(symbol)
+
+# Recorder of a walk for the given record_path mode, None when the path is not
+# recorded.  `topology` is the graph's ("path" selects the 1-bit moves) or
+# "implicit" for ImplicitTree walks, which pass their own move symbols.
+def path_recorder(mode, start_node, topology=None, branching_factor=None):
+    if mode is False or mode is None:
+        return None
+    if mode is True or mode == "tuples":
+        return _TuplePath(start_node)
+    if mode == "nodes":
+        if topology == "implicit":
+            raise ValueError("ImplicitTree node ids outgrow int32 within a few dozen levels, record 'moves' instead")
+        return _NodePath(start_node)
+    if mode == "moves":
+        if topology == "path":
+            return _PathMoves(start_node)
+        if topology == "implicit":
+            return _SymbolMoves(start_node, branching_factor)
+        if topology == "gasket":
+            return _GasketMoves(start_node)
+        return _SlotMoves(start_node)
+    raise ValueError(f"unknown record_path mode {mode!r}, expected one of {PATH_MODES}")
+
+# A delta-encoded walk path: `length` move symbols of `bits` bits each, packed
+# little-end first into the bytes of `data`
+class EncodedPath:
+    def __init__(self, kind, start_node, symbols, branching_factor=None):
+        symbols = np.asarray(symbols, dtype=np.uint8)
+        self.kind = kind
+        self.start_node = int(start_node)
+        self.branching_factor = branching_factor
+        self.length = len(symbols)
+        largest = int(symbols.max(initial=0))
+        self.bits = next(bits for bits in (1, 2, 4, 8) if largest < 1 << bits)
+        per_byte = 8 // self.bits
+        padded = np.zeros(-(-self.length // per_byte) * per_byte, dtype=np.uint8)
+        padded[:self.length] = symbols
+        shifts = (self.bits * np.arange(per_byte)).astype(np.uint8)
+        self.data = np.bitwise_or.reduce(padded.reshape(-1, per_byte) << shifts, axis=1).astype(np.uint8)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def symbols(self):
+        per_byte = 8 // self.bits
+        shifts = (self.bits * np.arange(per_byte)).astype(np.uint8)
+        symbols = (self.data[:, None] >> shifts) & ((1 << self.bits) - 1)
+        return symbols.ravel()[:self.length]
+
+    # The visited nodes, starting with the start node.  Slot moves need the graph
+    # the walk ended on.  ImplicitTree ids are unbounded, they come back as an
+    # object array of Python ints.
+    def nodes(self, G=None):
+        symbols = self.symbols()
+        if self.kind == "path":
+            steps = 2 * symbols.astype(np.int64) - 1
+            return np.concatenate([[0], np.cumsum(steps)]).astype(np.int32) + self.start_node
+        if self.kind == "implicit":
+            b = self.branching_factor
+            node = self.start_node
+            nodes = [node]
+            for symbol in symbols.tolist():
+                node = (node - 1) // b if symbol == b else node * b + 1 + symbol
+                nodes.append(node)
+            return np.array(nodes + [None], dtype=object)[:-1]
+        if G is None:
+            raise ValueError("decoding slot moves needs the graph the walk ended on")
+        if self.kind == "gasket":
+            nodes = [self.start_node]
+            for symbol in symbols.tolist():
+                nodes.append(G.neighbors(nodes[-1])[symbol])
+            return np.array(nodes, dtype=np.int64)
+        nodes = np.empty(self.length + 1, dtype=np.int32)
+        node = nodes[0] = self.start_node
+        adj = G.adj
+        for i, symbol in enumerate(symbols.tolist(), 1):
+            node = nodes[i] = adj[node, symbol]
+        return nodes
+
+    def edges(self, G=None):
+        nodes = self.nodes(G)
+        if nodes.dtype == object:
+            return np.stack([nodes[:-1], nodes[1:]], axis=1)
+        return _pairs(nodes)
+
+# Encode an array of visited nodes as moves on the graph G the walk ended on
+def encode_nodes(nodes, G, chunk_size=1 << 20):
+    nodes = np.asarray(nodes)
+    if G.topology == "path":
+        return EncodedPath("path", nodes[0], nodes[1:] > nodes[:-1])
+    gasket = G.topology == "gasket"
+    symbols = np.empty(len(nodes) - 1, dtype=np.uint8)
+    for start in range(0, len(symbols), chunk_size):
+        stop = min(start + chunk_size, len(symbols))
+        rows = G.neighbor_rows(nodes[start:stop]) if gasket else G.adj[nodes[start:stop]]
+        symbols[start:stop] = np.argmax(rows == nodes[start + 1:stop + 1, None], axis=1)
+    return EncodedPath("gasket" if gasket else "slots", nodes[0], symbols)
+
+# The steps of a recorded path in any mode as an (n, 2) array; G is the graph
+# the walk ended on (or the ImplicitTree), needed for slot moves
+def decode_path(path, G=None):
+    if path is None:
+        raise ValueError("the walk did not record its path, run it with record_path=True, 'nodes' or 'moves'")
+    if isinstance(path, EncodedPath):
+        return path.edges(G)
+    path = np.asarray(path)
+    return path.reshape(-1, 2) if path.dtype == object else path.astype(np.int64, copy=False).reshape(-1, 2)
@@ -0,0 +1,238 @@
+import subprocess
+
+import numpy as np
+
+# Incremental renderer for the walk animations.  The fractal is drawn once as a
+# LineCollection and saved as the background; every frame only restores that
+# background, draws the steps taken since the previous frame and saves the
+# result as the new background (blitting), so a frame costs as much as the steps
+# it adds and a whole animation is linear in the number of steps.  Frames go
+# straight to Pillow for GIFs or to an ffmpeg pipe for videos.
+#
+#   render_walk("walk.gif", G.coords, G.edges(), path, title="Step {step}/{steps}")
+
+FORWARD_COLOR = "red"
+BACKWARD_COLOR = "blue"
+GRAPH_COLOR = "gray"
+
+# Split a walk path into (sources, targets, backward) arrays in one pass.
+#   by="node": a step is backward when it enters a node the walk entered before
+#   by="edge": a step is backward when it retraces an edge the walk took forward
+def classify_steps(path, by="node"):
+    path = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+    sources, targets = path[:, 0], path[:, 1]
+    if by == "node":
+        backward = np.ones(len(path), dtype=bool)
+        backward[np.unique(targets, return_index=True)[1]] = False
+    elif by == "edge":
+        backward = np.zeros(len(path), dtype=bool)
+        forward = set()
+        for i, (u, v) in enumerate(path.tolist()):
+            if (v, u) in forward:
+                backward[i] = True
+            else:
+                forward.add((u, v))
+    else:
+        raise ValueError(f"unknown step classification {by!r}, expected 'node' or 'edge'")
+    return sources, targets, backward
+
+# Number of steps shown after each frame: every `every` steps, fewer frames when
+# max_frames caps them, and always a last frame with the whole path
+def _frame_ends(steps, every, max_frames):
+    if max_frames:
+        every = max(every, -(-steps // max_frames))
+    ends = list(range(every, steps, every))
+    return ends + [steps]
+
+# Render the walk `path` ((u, v) steps) over the graph with node coordinates
+# `positions` (n, 2) and `edges` (m, 2) into `filename`, .gif through Pillow and
+# any other extension (.mp4, ...) through ffmpeg.  `title` is a format string
+# with the fields {step}, {steps} and {edge}.  Returns the number of frames.
+def render_walk(filename, positions, edges, path, by="node", title="Step {step}/{steps}", fps=20,
+                every=1, max_frames=None, figsize=(12, 8), dpi=100, node_size=10,
+                node_color=GRAPH_COLOR, labels=False):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import to_rgba
+    from matplotlib.figure import Figure
+
+    positions = np.asarray(positions, dtype=float)
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    sources, targets, backward = classify_steps(path, by)
+    steps = len(sources)
+    segments = positions[np.stack([sources, targets], axis=1)]
+    colors = np.where(backward[:, None], to_rgba(BACKWARD_COLOR), to_rgba(FORWARD_COLOR))
+
+    # Static part: the graph, its nodes and optional labels, drawn once
+    fig = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_axis_off()
+    ax.add_collection(LineCollection(positions[edges], colors=GRAPH_COLOR, linewidths=1, zorder=1))
+    ax.scatter(positions[:, 0], positions[:, 1], s=node_size, c=node_color, zorder=2)
+    if labels:
+        for node, (x, y) in enumerate(positions.tolist()):
+            ax.text(x, y, str(node), ha="center", va="center", fontsize=10, fontweight="bold", zorder=3)
+    ax.autoscale_view()
+
+    # Animated part: new steps, the walker and the title are drawn by hand
+    walk = LineCollection([], linewidths=2, zorder=4, animated=True)
+    ax.add_collection(walk, autolim=False)
+    walker, = ax.plot([], [], "o", color="black", markersize=6, zorder=5, animated=True)
+    heading = ax.set_title("", animated=True)
+    canvas.draw()
+    ends = _frame_ends(steps, every, max_frames)
+
+    def frames():
+        background = canvas.copy_from_bbox(fig.bbox)
+        shown = 0
+        for end in ends:
+            canvas.restore_region(background)
+            walk.set_segments(segments[shown:end])
+            walk.set_color(colors[shown:end])
+            ax.draw_artist(walk)
+            # The steps stay drawn, the walker and title are redrawn every frame
+            background = canvas.copy_from_bbox(fig.bbox)
+            shown = end
+            if end:
+                walker.set_data(positions[targets[end - 1], :1], positions[targets[end - 1], 1:])
+                ax.draw_artist(walker)
+            edge = (int(sources[end - 1]), int(targets[end - 1])) if end else None
+            heading.set_text(title.format(step=end, steps=steps, edge=edge))
+            ax.draw_artist(heading)
+            yield np.asarray(canvas.buffer_rgba())
+
+    if filename.lower().endswith(".gif"):
+        colors_used = ["white", "black", GRAPH_COLOR, node_color, FORWARD_COLOR, BACKWARD_COLOR]
+        _write_gif(filename, frames(), fps, [to_rgba(c)[:3] for c in colors_used])
+    else:
+        _write_video(filename, frames(), fps, canvas.get_width_height())
+    return len(ends)
+
+# GIF through Pillow.  Every frame is mapped onto one fixed palette of the drawn
+# colors and their antialiasing blends, which is much cheaper than an adaptive
+# palette per frame and keeps the colors stable across frames.
+def _write_gif(filename, frames, fps, colors):
+    from PIL import Image
+
+    colors = np.unique(np.round(np.array(colors) * 255), axis=0)
+    blends = [colors]
+    for i in range(len(colors)):
+        for j in range(i + 1, len(colors)):
+            t = np.linspace(0, 1, 9)[1:-1, None]
+            blends.append((1 - t) * colors[i] + t * colors[j])
+    palette = np.unique(np.concatenate(blends).round().astype(np.uint8), axis=0)[:256]
+    palette_image = Image.new("P", (1, 1))
+    palette_image.putpalette(palette.ravel().tolist())
+
+    images = (Image.fromarray(frame, "RGBA").convert("RGB").quantize(palette=palette_image, dither=Image.Dither.NONE)
+              for frame in frames)
+    first = next(images)
+    first.save(filename, save_all=True, append_images=images, duration=1000 / fps, loop=0, optimize=False)
+
+# Any format ffmpeg knows, raw RGBA frames are piped to its stdin
+def _write_video(filename, frames, fps, size):
+    from matplotlib import rcParams
+
+    width, height = size
+    command = [rcParams["animation.ffmpeg_path"], "-y", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+               "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p", filename]
+    with subprocess.Popen(command, stdin=subprocess.PIPE) as ffmpeg:
+        for frame in frames:
+            ffmpeg.stdin.write(frame.tobytes())
+        ffmpeg.stdin.close()
+        if ffmpeg.wait():
+            raise RuntimeError(f"ffmpeg failed to write {filename}")
+
+
+# add() bins a chunk with a full-image bincount from 1/_BINCOUNT_RATIO visits
+# per pixel on, and smaller ones pixel by pixel
+_BINCOUNT_RATIO = 16
+
+# Visit-density heatmap of walks on lattice graphs.  Visits are binned straight
+# into a fixed-size count image from the lattice coordinates of the nodes, in
+# chunks as the walk streams them, so memory is bounded by the image and not by
+# the length of the walk, and no matplotlib artist is created per edge.
+#
+#   density = VisitDensity(lambda: G.curve, extent=bounds, width=1024, frame_every=10**6)
+#   move_and_extend_dragon(0, G, 10**7, 3, visits=density)
+#   density.save("density.png")
+#
+# `positions` maps node ids to (x, y), either an array or a callable returning
+# the current one for graphs that grow during the walk (LazyDragonGraph.curve or
+# .coords).  `extent` (xmin, xmax, ymin, ymax) fixes the image area and defaults
+# to the bounding box of the initial positions; visits outside it are counted in
+# `outside`.  With frame_every, an image is saved every that many visits.
+class VisitDensity:
+    def __init__(self, positions, extent=None, width=1024, chunk_size=1 << 20, frame_every=None,
+                 frame_pattern="density_{frame:05d}.png", cmap="magma", log=True):
+        self.positions = positions
+        if extent is None:
+            points = self._positions()
+            extent = (points[:, 0].min(), points[:, 0].max(), points[:, 1].min(), points[:, 1].max())
+        xmin, xmax, ymin, ymax = (float(v) for v in extent)
+        # Square pixels, with half a lattice unit of margin around the extent
+        self.origin = np.array([xmin - 0.5, ymin - 0.5])
+        self.scale = width / (xmax - xmin + 1)
+        height = max(1, int(np.ceil((ymax - ymin + 1) * self.scale)))
+        self.shape = (height, width)
+        self.counts = np.zeros(self.shape, dtype=np.int64)
+        self.outside = 0
+        self.visits = 0
+        self.chunk_size = chunk_size
+        self._pending = []
+        self.frame_every = frame_every
+        self.frame_pattern = frame_pattern
+        self.frames = 0
+        self.cmap = cmap
+        self.log = log
+
+    def _positions(self):
+        return np.asarray(self.positions() if callable(self.positions) else self.positions)
+
+    # One visited node, buffered and binned once a chunk is full
+    def record(self, node):
+        self._pending.append(node)
+        if len(self._pending) >= self.chunk_size or (
+                self.frame_every and self.visits + len(self._pending) >= (self.frames + 1) * self.frame_every):
+            self.flush()
+
+    # Bin the buffered visits into the count image
+    def flush(self):
+        if self._pending:
+            nodes, self._pending = self._pending, []
+            self.add(np.array(nodes, dtype=np.int64))
+
+    # An array of visited nodes, e.g. the positions of a batch of walkers
+    def add(self, nodes):
+        points = self._positions()[np.asarray(nodes)]
+        pixels = np.floor((points - self.origin) * self.scale).astype(np.int64)
+        height, width = self.shape
+        inside = (pixels[:, 0] >= 0) & (pixels[:, 0] < width) & (pixels[:, 1] >= 0) & (pixels[:, 1] < height)
+        self.outside += len(pixels) - int(inside.sum())
+        flat = pixels[inside, 1] * width + pixels[inside, 0]
+        # A full-image bincount only pays off for large chunks, a batch of walkers
+        # is added every step and only touches as many pixels as it has walkers
+        if len(flat) * _BINCOUNT_RATIO >= height * width:
+            self.counts += np.bincount(flat, minlength=height * width).reshape(self.shape)
+        else:
+            np.add.at(self.counts.reshape(-1), flat, 1)
+        self.visits += len(pixels)
+        while self.frame_every and self.visits >= (self.frames + 1) * self.frame_every:
+            self.frames += 1
+            self.save(self.frame_pattern.format(frame=self.frames))
+
+    # RGBA image of the counts (north up), log-scaled unless log=False
+    def image(self):
+        from matplotlib import colormaps
+
+        values = np.log1p(self.counts) if self.log else self.counts.astype(float)
+        top = values.max()
+        return colormaps[self.cmap](values[::-1] / top if top else values[::-1], bytes=True)
+
+    def save(self, filename):
+        from PIL import Image
+
+        self.flush()
+        Image.fromarray(self.image()).save(filename)
@@ -0,0 +1,246 @@
+import multiprocessing
+
+import numpy as np
+
+from .parallel import default_processes, spawn_seeds
+from .tracy_widom import tw_cdf, tw_fit, tw_ppf
+
+# Bootstrap and permutation engine for the goodness-of-fit tests.  Resamples are
+# drawn in blocks of rows of a 2-D array and every statistic is computed for a
+# whole block at once.  Blocks get their own seed spawned from one master seed
+# and their size only depends on the sample size, so results are reproducible
+# and the same whatever the number of worker processes.
+#
+#   ks, low, high = bootstrap_ci(depths, "ks", TracyWidomFamily(), seed=1)
+#   ks, p_value = parametric_bootstrap(depths, "ks", TracyWidomFamily(), seed=1)
+
+# Upper bound on the size of one block of resamples
+_BATCH_BYTES = 64 << 20
+
+# Samples with fewer distinct values than this fraction of their size are
+# resampled by multinomial counts of the values, which needs no sorting
+_COUNTS_FRACTION = 1 / 16
+
+
+# Distribution families the statistics are computed against.  fit() estimates
+# the parameters of every row of a 2-D array, cdf() and rvs() take them back.
+class NormalFamily:
+    def fit(self, samples):
+        return samples.mean(axis=-1, keepdims=True), samples.std(axis=-1, ddof=1, keepdims=True)
+
+    def cdf(self, x, params):
+        from scipy.special import ndtr
+        loc, scale = params
+        return ndtr((x - loc) / scale)
+
+    def rvs(self, params, n, rng):
+        loc, scale = params
+        return loc + scale * rng.standard_normal((len(loc), n))
+
+class TracyWidomFamily:
+    def __init__(self, beta=1):
+        self.beta = beta
+
+    def fit(self, samples):
+        loc, scale = tw_fit(samples, self.beta)
+        return loc[..., None], scale[..., None]
+
+    def cdf(self, x, params):
+        return tw_cdf(x, *params, beta=self.beta)
+
+    def rvs(self, params, n, rng):
+        loc, scale = params
+        return tw_ppf(rng.random((len(loc), n)), loc, scale, beta=self.beta)
+
+
+# Goodness-of-fit statistics of every row of a 2-D array of sorted samples, with
+# the parameters of `family` estimated from the row itself
+
+# Kolmogorov-Smirnov distance between the empirical and the fitted CDF
+def ks_statistic(rows, family):
+    n = rows.shape[1]
+    cdf = family.cdf(rows, family.fit(rows))
+    i = np.arange(1, n + 1)
+    return np.maximum((i / n - cdf).max(axis=1), (cdf - (i - 1) / n).max(axis=1))
+
+# Anderson-Darling A^2, which weights the tails more than the KS distance
+def ad_statistic(rows, family):
+    n = rows.shape[1]
+    cdf = np.clip(family.cdf(rows, family.fit(rows)), 1e-300, 1 - 1e-16)
+    weights = 2 * np.arange(1, n + 1) - 1
+    return -n - (weights * (np.log(cdf) + np.log1p(-cdf[:, ::-1]))).sum(axis=1) / n
+
+_shapiro_weights = {}
+
+# Royston's approximation of the Shapiro-Wilk coefficients for samples of size n.
+# It holds for any n, unlike scipy.stats.shapiro whose p-value stops at 5000.
+def _shapiro_coefficients(n):
+    if n in _shapiro_weights:
+        return _shapiro_weights[n]
+    if n < 3:
+        raise ValueError("the Shapiro-Wilk statistic needs at least 3 values")
+    from scipy.special import ndtri
+    m = ndtri((np.arange(1, n + 1) - 0.375) / (n + 0.25))
+    c = m / np.sqrt(m @ m)
+    u = 1 / np.sqrt(n)
+    a = np.empty(n)
+    if n == 3:
+        a[:] = [-np.sqrt(0.5), 0.0, np.sqrt(0.5)]
+    else:
+        a[-1] = c[-1] + np.polyval([-2.706056, 4.434685, -2.071190, -0.147981, 0.221157, 0], u)
+        tail = 1
+        if n > 5:
+            a[-2] = c[-2] + np.polyval([-3.582633, 5.682633, -1.752461, -0.293762, 0.042981, 0], u)
+            tail = 2
+        phi = (m @ m - 2 * (m[-tail:] ** 2).sum()) / (1 - 2 * (a[-tail:] ** 2).sum())
+        a[tail:-tail] = m[tail:-tail] / np.sqrt(phi)
+        a[:tail] = -a[-tail:][::-1]
+    _shapiro_weights[n] = a
+    return a
+
+# Shapiro-Wilk W, small values speak against normality.  The family is unused,
+# W is location and scale invariant by construction.
+def shapiro_statistic(rows, family=None):
+    a = _shapiro_coefficients(rows.shape[1])
+    centered = rows - rows.mean(axis=1, keepdims=True)
+    return (rows @ a) ** 2 / (centered ** 2).sum(axis=1)
+
+# Statistics by name, with the side of the null distribution that rejects
+STATISTICS = {
+    "ks": (ks_statistic, "greater"),
+    "ad": (ad_statistic, "greater"),
+    "shapiro": (shapiro_statistic, "less"),
+}
+
+
+# Two-sample statistics of a pooled sorted sample split by boolean label rows
+# (True for the first sample).  Only the labels are permuted, so neither needs
+# to sort anything per permutation.
+
+# Two-sample KS distance, evaluated at the last value of every run of ties
+def ks_2samp_statistic(pooled, labels, ends):
+    n_x = labels[0].sum()
+    n_y = labels.shape[1] - n_x
+    in_x = np.cumsum(labels, axis=1)[:, ends]
+    in_y = (ends + 1) - in_x
+    return np.abs(in_x / n_x - in_y / n_y).max(axis=1)
+
+# Difference of the sample means
+def mean_difference(pooled, labels, ends):
+    n_x = labels[0].sum()
+    n_y = labels.shape[1] - n_x
+    sum_x = labels @ pooled
+    return sum_x / n_x - (pooled.sum() - sum_x) / n_y
+
+TWO_SAMPLE_STATISTICS = {
+    "ks": (ks_2samp_statistic, "greater"),
+    "mean": (mean_difference, "two-sided"),
+}
+
+
+def _resolve(statistic, table):
+    if callable(statistic):
+        return statistic, "greater"
+    if statistic not in table:
+        raise ValueError(f"unknown statistic {statistic!r}, expected one of {sorted(table)}")
+    return table[statistic]
+
+def _block_sizes(n_resamples, n):
+    rows = max(1, _BATCH_BYTES // (8 * max(n, 1)))
+    return [min(rows, n_resamples - start) for start in range(0, n_resamples, rows)]
+
+# Sorted bootstrap resamples of a sorted sample, one per row
+def _resample_sorted(sample, values, freq, rows, rng):
+    n = len(sample)
+    if values is not None:
+        # Few distinct values: draw how often each one appears, already in order
+        counts = rng.multinomial(n, freq, size=rows)
+        return np.stack([np.repeat(values, row) for row in counts])
+    return sample[np.sort(rng.integers(0, n, size=(rows, n)), axis=1)]
+
+# Compute one block of resampled statistics inside a worker
+def _run_block(task):
+    kind, data, statistic, family, rows, seed = task
+    rng = np.random.default_rng(seed)
+    if kind == "bootstrap":
+        sample, values, freq = data
+        return statistic(_resample_sorted(sample, values, freq, rows, rng), family)
+    if kind == "parametric":
+        params, n = data
+        # Simulate from the fitted model, the statistic re-fits every simulated row
+        params = tuple(np.repeat(p, rows, axis=0) for p in params)
+        return statistic(np.sort(family.rvs(params, n, rng), axis=1), family)
+    pooled, base, ends = data
+    labels = rng.permuted(np.broadcast_to(base, (rows, len(base))), axis=1)
+    return statistic(pooled, labels, ends)
+
+# Run the blocks inline or across a process pool, in block order
+def _run_blocks(kind, data, statistic, family, n_resamples, n, seed, processes):
+    sizes = _block_sizes(n_resamples, n)
+    tasks = [(kind, data, statistic, family, rows, block_seed)
+             for rows, block_seed in zip(sizes, spawn_seeds(seed, len(sizes)))]
+    if processes is None:
+        processes = default_processes()
+    if processes == 1 or len(tasks) == 1:
+        return np.concatenate(list(map(_run_block, tasks)))
+    with multiprocessing.Pool(min(processes, len(tasks))) as pool:
+        return np.concatenate(pool.map(_run_block, tasks))
+
+def _p_value(observed, null, alternative):
+    if alternative == "greater":
+        extreme = null >= observed
+    elif alternative == "less":
+        extreme = null <= observed
+    else:
+        extreme = np.abs(null) >= np.abs(observed)
+    # Count the observed sample as one of the resamples, so p is never 0
+    return (extreme.sum() + 1) / (len(null) + 1)
+
+# Percentile bootstrap confidence interval of a goodness-of-fit statistic.
+# `statistic` is a name from STATISTICS or a callable(rows, family) -> one value
+# per row of sorted samples.  Returns (statistic, low, high).
+def bootstrap_ci(sample, statistic="ks", family=None, n_resamples=1000, confidence=0.95,
+                 seed=None, processes=1):
+    statistic, _ = _resolve(statistic, STATISTICS)
+    family = NormalFamily() if family is None else family
+    sample = np.sort(np.asarray(sample, dtype=float).ravel())
+    observed = statistic(sample[None, :], family)[0]
+
+    values, counts = np.unique(sample, return_counts=True)
+    data = (sample, None, None)
+    if len(values) < _COUNTS_FRACTION * len(sample):
+        data = (sample, values, counts / len(sample))
+
+    null = _run_blocks("bootstrap", data, statistic, family, n_resamples, len(sample), seed, processes)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(null, [alpha, 1 - alpha])
+    return float(observed), float(low), float(high)
+
+# Parametric bootstrap p-value of a goodness-of-fit test whose parameters are
+# estimated from the sample: the sample is compared with simulated samples of
+# the fitted family, each re-fitted the same way.  Returns (statistic, p_value).
+def parametric_bootstrap(sample, statistic="ks", family=None, n_resamples=1000, seed=None, processes=1):
+    statistic, alternative = _resolve(statistic, STATISTICS)
+    family = NormalFamily() if family is None else family
+    sample = np.sort(np.asarray(sample, dtype=float).ravel())[None, :]
+    observed = statistic(sample, family)[0]
+    data = (family.fit(sample), sample.shape[1])
+    null = _run_blocks("parametric", data, statistic, family, n_resamples, sample.shape[1], seed, processes)
+    return float(observed), float(_p_value(observed, null, alternative))
+
+# Permutation test of two samples, e.g. the depths of two parameter settings.
+# `statistic` is "ks" or "mean", or a callable(pooled, labels, ends) -> one value
+# per row of labels.  Returns (statistic, p_value).
+def permutation_test(x, y, statistic="ks", n_resamples=1000, seed=None, processes=1):
+    statistic, alternative = _resolve(statistic, TWO_SAMPLE_STATISTICS)
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    pooled = np.concatenate([x, y])
+    order = np.argsort(pooled, kind="stable")
+    pooled = pooled[order]
+    base = order < len(x)
+    ends = np.append(np.flatnonzero(np.diff(pooled)), len(pooled) - 1)
+    observed = statistic(pooled, base[None, :], ends)[0]
+    null = _run_blocks("permutation", (pooled, base, ends), statistic, None, n_resamples, len(pooled),
+                       seed, processes)
+    return float(observed), float(_p_value(observed, null, alternative))
@@ -0,0 +1,123 @@
+from bisect import bisect
+from functools import lru_cache
+from itertools import accumulate, chain
+
+import numpy as np
+
+# Step sampling for the biased walks.  The weight of a neighbor only depends on
+# whether the walker visited it before, so for a node of degree d there are 2^d
+# possible weight vectors.  A TransitionTable computes the cumulative weights of
+# all of them once, keyed by (1 << d) | mask with bit k of `mask` set when the
+# neighbor in slot k was visited; a step then costs one table lookup and a
+# bisect over at most d cumulative weights, instead of building and summing a
+# weights list every step.
+#
+#   move_and_extend_dragon(0, G, 1000, 3)                          # 3:1, the default
+#   move_and_extend_dragon(0, G, 1000, 3, transitions=5)           # 5:1
+#   move_and_extend_dragon(0, G, 1000, 3, transitions=policy)      # any policy(visited) -> weights
+#   move_and_extend_dragon(0, G, 1000, 3, rng=np.random.default_rng(0))
+#
+# A choice is the one random.choices makes for the same uniform u: the first
+# neighbor whose cumulative weight exceeds u times the total weight.  With a
+# random.Random as `rng` the walks draw exactly as before; with a numpy Generator
+# the uniforms are drawn in blocks of _BLOCK.
+
+# Uniforms generated per block, after a first block of _FIRST_BLOCK
+_BLOCK = 1 << 16
+_FIRST_BLOCK = 1 << 10
+
+# Cumulative weights of every (degree, visited mask) pair up to max_degree.  `bias`
+# is the weight of an unvisited neighbor against 1 for a visited one; `policy`
+# replaces that rule, it gets the tuple of visited flags of the neighbors in slot
+# order and returns their weights (non-negative, not all zero).
+class TransitionTable:
+    def __init__(self, bias=3, policy=None, max_degree=8):
+        self.bias = bias
+        self.policy = policy
+        self.max_degree = max_degree
+        self.entries = [self._entry(key) for key in range(1 << (max_degree + 1))]
+        # The same table as arrays for the kernels and the batched walks, padded with inf
+        self.cumulative = np.full((len(self.entries), max(max_degree, 1)), np.inf)
+        self.totals = np.zeros(len(self.entries))
+        for key, (cumulative, total) in enumerate(self.entries):
+            self.cumulative[key, :len(cumulative)] = cumulative
+            self.totals[key] = total
+
+    def weights(self, visited):
+        if self.policy is not None:
+            return list(self.policy(visited))
+        return [1 if flag else self.bias for flag in visited]
+
+    # (cumulative weights, total) for a key; key 0 is not a valid key and stays empty
+    def _entry(self, key):
+        if key == 0:
+            return [], 0.0
+        degree = key.bit_length() - 1
+        visited = tuple(bool(key >> k & 1) for k in range(degree))
+        weights = self.weights(visited)
+        if len(weights) != degree or any(w < 0 for w in weights) or (degree and not sum(weights) > 0):
+            raise ValueError(f"transition weights {weights} for visited flags {visited} must be {degree} "
+                             "non-negative numbers with a positive sum")
+        cumulative = list(accumulate(weights))
+        return cumulative, (cumulative[-1] + 0.0 if cumulative else 0.0)
+
+    # Slot of the neighbor chosen by the uniform u at a node with the given key
+    def choose(self, key, u):
+        cumulative, total = self.entries[key]
+        return bisect(cumulative, u * total, 0, len(cumulative) - 1)
+
+    # Keys of every node in a batch: `visited` holds the visited flags of the
+    # neighbor slots, `degree` the number of valid slots
+    def keys(self, visited, degree):
+        slots = np.arange(visited.shape[1])
+        mask = (visited & (slots < degree[:, None])) << slots
+        return (1 << degree) | mask.sum(axis=1)
+
+# Shared tables for the bias ratios and policies the walks are given
+@lru_cache(maxsize=None)
+def _cached_table(bias, policy):
+    return TransitionTable(bias, policy)
+
+# The TransitionTable for a walk's `transitions` argument: None (3:1), a bias
+# ratio, a policy function or a table
+def transition_table(transitions=None):
+    if isinstance(transitions, TransitionTable):
+        return transitions
+    if transitions is None:
+        return _cached_table(3, None)
+    if callable(transitions):
+        return _cached_table(None, transitions)
+    return _cached_table(transitions, None)
+
+# Endless stream of uniforms drawn from a numpy Generator in blocks.  The blocks
+# start small and double up to block_size, so short walks do not pay for a full
+# block; the generator yields the same numbers however they are split in blocks.
+def block_uniforms(rng, block_size=_BLOCK):
+    return chain.from_iterable(_blocks(rng, block_size))
+
+def _blocks(rng, block_size):
+    size = min(_FIRST_BLOCK, block_size)
+    while True:
+        yield rng.random(size).tolist()
+        size = min(2 * size, block_size)
+
+# No-argument function returning the next uniform of `rng`: blocks for a numpy
+# Generator, the random() method of anything with the random.Random interface
+def uniform_source(rng):
+    if isinstance(rng, np.random.Generator):
+        return block_uniforms(rng).__next__
+    return rng.random
+
+# Uniform choice from a sequence and uniform integer below n, one uniform each
+# from a numpy Generator; random.Random keeps its own choice and randrange
+def choice_source(rng):
+    if isinstance(rng, np.random.Generator):
+        draw = uniform_source(rng)
+        return lambda seq: seq[int(draw() * len(seq))]
+    return rng.choice
+
+def randrange_source(rng):
+    if isinstance(rng, np.random.Generator):
+        draw = uniform_source(rng)
+        return lambda n: int(draw() * n)
+    return rng.randrange
@@ -0,0 +1,203 @@
+import contextlib
+import multiprocessing
+from statistics import NormalDist
+
+import numpy as np
+
+from .histogram import DepthHistogram, _sum_pairs
+from .parallel import default_processes, run_walks
+
+# Sequential Monte Carlo driver: runs walks through run_walks in batches of
+# `batch_size` and stops as soon as the requested precision is reached, instead
+# of a fixed number of walks.  The results are counted into a DepthHistogram as
+# they arrive, so the running estimates cost the same after 10^3 or 10^6 walks.
+#
+#   run = run_sequential(move_and_extend_dragon, make_graph, walk_args=(2000, 3), extract=itemgetter(1),
+#                        mean_width=2.0, quantile_widths={0.5: 4}, max_walks=20000)
+#   print(run.n_walks, run.mean, run.report())
+#
+# Stopping criteria, all of the given ones must hold at confidence `confidence`:
+#   mean_width:      width of the confidence interval of the mean
+#   quantile_widths: {q: width} widths of the distribution-free (order statistic)
+#                    confidence intervals of the quantiles
+#   histogram_tol:   total variation distance between the histograms before and
+#                    after the last batch
+#   ks_band:         half-width of the Dvoretzky-Kiefer-Wolfowitz band, i.e. enough
+#                    walks to resolve a KS distance of that size; the KS statistic
+#                    against `reference` (a CDF) is tracked when one is given
+# The run stops at max_walks whatever the estimates, `converged` tells which.
+# Walk i gets the same seed whatever the batch size, so a run with a fixed seed
+# is reproducible.  With horizons every walk contributes one value per horizon to
+# the histogram, but these values are correlated, so the intervals count walks:
+# the mean interval comes from the per-walk means, and the quantile intervals and
+# the KS band use n_walks as the sample size.
+
+class SequentialRun:
+    def __init__(self, histogram, confidence, values=None):
+        self.histogram = histogram
+        self.confidence = confidence
+        self.values = values
+        self.n_walks = 0
+        self.walk_total = 0.0    # Sum and sum of squares of the per-walk means
+        self.walk_total_sq = 0.0
+        self.batches = 0
+        self.converged = False
+        self.history = []
+
+    @property
+    def mean(self):
+        return self.histogram.mean
+
+    @property
+    def n_samples(self):
+        return self.histogram.n
+
+    # z value of the two-sided interval at the run's confidence
+    @property
+    def _z(self):
+        return NormalDist().inv_cdf(0.5 + self.confidence / 2)
+
+    # Width of the interval of the mean, from the spread of the per-walk means
+    def mean_width(self):
+        if self.n_walks < 2:
+            return np.inf
+        var = max(self.walk_total_sq - self.walk_total ** 2 / self.n_walks, 0.0) / (self.n_walks - 1)
+        return float(2 * self._z * np.sqrt(var / self.n_walks))
+
+    # Value of the k-th smallest sample (1-based), from the histogram
+    def _order_statistic(self, k):
+        cumulative = np.cumsum(self.histogram.counts)
+        k = min(max(k, 1), self.histogram.n)
+        return float(self.histogram.centers[np.searchsorted(cumulative, k)])
+
+    def quantile(self, q):
+        return self._order_statistic(int(np.ceil(q * self.histogram.n)))
+
+    # Distribution-free interval of the q-quantile between two order statistics.  The
+    # rank spread is that of n_walks samples scaled to the n values, so the values of
+    # one walk count as a single sample, exactly so when they are equal.
+    def quantile_interval(self, q):
+        n = self.histogram.n
+        spread = self._z * np.sqrt(self.n_walks * q * (1 - q)) * n / self.n_walks
+        return self._order_statistic(int(np.floor(n * q - spread))), self._order_statistic(int(np.ceil(n * q + spread)))
+
+    def ks_band(self):
+        return float(np.sqrt(np.log(2 / (1 - self.confidence)) / (2 * self.n_walks)))
+
+    # KS statistic of the samples against a continuous CDF, evaluated on both
+    # sides of the jumps of the empirical CDF
+    def ks_statistic(self, reference):
+        counts = self.histogram.counts
+        seen = counts > 0
+        centers = self.histogram.centers[seen]
+        empirical = np.cumsum(counts[seen]) / self.histogram.n
+        cdf = np.asarray(reference(centers), dtype=float)
+        below = np.concatenate([[0.0], empirical[:-1]])
+        return float(max((empirical - cdf).max(), (cdf - below).max()))
+
+    def report(self):
+        lines = [f"{'walks':>8s} {'samples':>9s} {'mean':>10s} {'mean width':>11s} {'hist dist':>10s} {'ks':>8s}"]
+        for entry in self.history:
+            distance = entry.get("histogram_distance")
+            ks = entry.get("ks")
+            lines.append(f"{entry['walks']:8d} {entry['samples']:9d} {entry['mean']:10.3f} {entry['mean_width']:11.3f} "
+                         f"{'' if distance is None else f'{distance:.4f}':>10s} {'' if ks is None else f'{ks:.4f}':>8s}")
+        status = "converged" if self.converged else "stopped at the walk budget"
+        lines.append(f"{status} after {self.n_walks} walks in {self.batches} batches")
+        return "\n".join(lines)
+
+# Histogram of one batch together with the sums of its per-walk means.  run_walks
+# counts the results into it inside the workers, one add() per walk.
+class _BatchCounts:
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.walks = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def empty(self):
+        return _BatchCounts(self.histogram.empty())
+
+    def add(self, result):
+        self.histogram.add(result)
+        mean = float(np.mean(result))
+        self.walks += 1
+        self.total += mean
+        self.total_sq += mean * mean
+        return self
+
+    def merge(self, other):
+        self.histogram.merge(other.histogram)
+        self.walks += other.walks
+        self.total += other.total
+        self.total_sq += other.total_sq
+        return self
+
+# Counts of a histogram summed up to a wider bin width
+def _counts_at(hist, width):
+    counts, w = hist.counts, hist.width
+    while w < width:
+        counts = _sum_pairs(counts)
+        w *= 2
+    return counts
+
+# Total variation distance between two histograms with the same bins
+def _total_variation(a, b):
+    width = max(a.width, b.width)
+    p, q = _counts_at(a, width) / a.n, _counts_at(b, width) / b.n
+    size = max(len(p), len(q))
+    return float(0.5 * np.abs(np.pad(p, (0, size - len(p))) - np.pad(q, (0, size - len(q)))).sum())
+
+# Run walks of `walk` in batches until the stopping criteria hold or max_walks is
+# reached, returns a SequentialRun.  The walk arguments are those of run_walks;
+# with keep_values=True the raw results are kept in run.values as well, e.g. for
+# a boxplot or a bootstrap test.  All batches run in one process pool, starting
+# the workers for every batch would cost more than a small batch of walks.
+def run_sequential(walk, make_graph, walk_args=(), walk_kwargs=None, start_node=0, extract=None, seed=None,
+                   processes=None, batch_size=250, min_walks=None, max_walks=10 ** 5, mean_width=None,
+                   quantile_widths=None, histogram_tol=None, ks_band=None, reference=None, confidence=0.95,
+                   keep_values=False, histogram=None):
+    min_walks = batch_size if min_walks is None else min_walks
+    seed = np.random.SeedSequence(seed).entropy # The walk seeds must come from one master seed across batches
+    run = SequentialRun(DepthHistogram() if histogram is None else histogram, confidence,
+                        [] if keep_values else None)
+    processes = default_processes() if processes is None else processes
+    with multiprocessing.Pool(processes) if processes > 1 else contextlib.nullcontext() as pool:
+        while run.n_walks < max_walks:
+            n = min(batch_size, max_walks - run.n_walks)
+            options = dict(walk_args=walk_args, walk_kwargs=walk_kwargs, start_node=start_node, extract=extract,
+                           seed=seed, processes=processes, offset=run.n_walks, pool=pool)
+            previous = run.histogram.empty().merge(run.histogram)
+            if keep_values:
+                results = run_walks(walk, make_graph, n, **options)
+                run.values.extend(results)
+                batch = _BatchCounts(run.histogram.empty())
+                for result in results:
+                    batch.add(result)
+            else:
+                batch = run_walks(walk, make_graph, n, histogram=_BatchCounts(run.histogram.empty()), **options)
+            run.histogram.merge(batch.histogram)
+            run.n_walks += n
+            run.walk_total += batch.total
+            run.walk_total_sq += batch.total_sq
+            run.batches += 1
+
+            entry = {"walks": run.n_walks, "samples": run.n_samples, "mean": run.mean, "mean_width": run.mean_width()}
+            met = [entry["mean_width"] <= mean_width] if mean_width is not None else []
+            for q, width in (quantile_widths or {}).items():
+                low, high = run.quantile_interval(q)
+                entry[f"q{q}"] = (run.quantile(q), high - low)
+                met.append(high - low <= width)
+            if previous.n:
+                entry["histogram_distance"] = _total_variation(previous, run.histogram)
+            if histogram_tol is not None:
+                met.append(previous.n > 0 and entry["histogram_distance"] <= histogram_tol)
+            if reference is not None:
+                entry["ks"] = run.ks_statistic(reference)
+            if ks_band is not None:
+                met.append(run.ks_band() <= ks_band)
+            run.history.append(entry)
+            if met and all(met) and run.n_walks >= min_walks:
+                run.converged = True
+                break
+    return run
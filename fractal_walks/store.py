@@ -0,0 +1,190 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from .parallel import default_processes, iter_walks, spawn_seeds
+
+# Chunked columnar store for simulation results.  A store is a directory with a
+# meta.json describing the columns and the run, and one sub-directory per chunk
+# holding a .npy file per column.  Chunks are written to a temporary directory
+# and renamed into place, so a chunk either exists completely or not at all and
+# an interrupted run resumes after the last completed chunk.  Columns are read
+# back as memory-mapped arrays, never as Python lists.
+#
+#   store = ResultStore("runs/dragon_n9", {"depth": "int64", "steps": "int64"},
+#                       params={"iterations": 9}, seed=1234)
+#   store.append(depth=12, steps=1000)
+#   store.close()
+#   depths = ResultStore("runs/dragon_n9").column("depth")
+
+META_FILE = "meta.json"
+
+# Columns recorded for every walk by run_walks_to_store
+WALK_COLUMNS = {
+    "depth": "int64",
+    "steps": "int64",
+    "seed": "uint64",
+    "iterations": "int64",       # Dragon Curve iterations, or the initial tree depth
+    "branching_factor": "int64", # 0 for the Dragon Curve
+    "bias": "float64",           # Unvisited to visited weight ratio, 1 for unbiased walks
+}
+
+# Walks per run_walks_to_store task by default.  Records reach the store one task at
+# a time, so a task has to finish well within checkpoint_seconds for the periodic
+# checkpoints to bound what a preempted run loses.
+STORE_TASK_WALKS = 100
+
+class ResultStore:
+    def __init__(self, path, columns=None, params=None, seed=None, chunk_size=10000, checkpoint_seconds=300):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.checkpoint_seconds = checkpoint_seconds
+        meta_path = os.path.join(path, META_FILE)
+
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+            if columns is not None and {k: np.dtype(v).str for k, v in columns.items()} != self.meta["columns"]:
+                raise ValueError(f"columns do not match the existing store at {path}")
+            if params is not None and params != self.meta["params"]:
+                raise ValueError(f"params do not match the existing store at {path}")
+        else:
+            if columns is None:
+                raise ValueError(f"no store at {path}, columns are needed to create one")
+            # Keep the master entropy so a resumed run spawns the same walk seeds
+            self.meta = {
+                "columns": {k: np.dtype(v).str for k, v in columns.items()},
+                "params": params or {},
+                "entropy": str(np.random.SeedSequence(seed).entropy),
+            }
+            os.makedirs(path, exist_ok=True)
+            tmp_path = f"{meta_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.meta, f, indent=2)
+            os.replace(tmp_path, meta_path)
+
+        self.columns = {k: np.dtype(v) for k, v in self.meta["columns"].items()}
+        self.params = self.meta["params"]
+        self.seed = int(self.meta["entropy"])
+        self._writing = False
+        self.chunks = self._completed_chunks()
+        self.num_rows = sum(self._chunk_rows(chunk) for chunk in self.chunks)
+        self._buffer = {name: [] for name in self.columns}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    # Chunks that were being written when a run was interrupted are discarded by the
+    # next writer.  Readers never clear them, the chunk may belong to a live writer.
+    def _clear_partial_chunks(self):
+        for name in os.listdir(self.path):
+            if name.endswith(".tmp") and name.startswith("chunk_"):
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def _completed_chunks(self):
+        return sorted(name for name in os.listdir(self.path)
+                      if name.startswith("chunk_") and not name.endswith(".tmp"))
+
+    def _chunk_rows(self, chunk):
+        first = next(iter(self.columns))
+        return len(np.load(os.path.join(self.path, chunk, f"{first}.npy"), mmap_mode="r"))
+
+    # Rows that are safely on disk, the number of walks to skip when resuming
+    @property
+    def completed_rows(self):
+        return self.num_rows
+
+    # Append one record (scalars) or a block of records (equal-length arrays)
+    def append(self, **values):
+        if set(values) != set(self.columns):
+            raise ValueError(f"expected columns {sorted(self.columns)}, got {sorted(values)}")
+        lengths = {np.size(v) for v in values.values()}
+        if len(lengths) != 1:
+            raise ValueError("all columns must have the same number of rows")
+        for name, value in values.items():
+            self._buffer[name].append(np.atleast_1d(np.asarray(value, dtype=self.columns[name])))
+        self._buffered += lengths.pop()
+
+        # Checkpoint on full chunks, and periodically so slow runs lose little on preemption
+        if self._buffered >= self.chunk_size:
+            self.flush(whole_chunks=True)
+        elif time.monotonic() - self._last_flush >= self.checkpoint_seconds:
+            self.flush()
+
+    # Write all buffered rows as completed chunks, or with whole_chunks only full
+    # chunks, keeping the remaining rows buffered
+    def flush(self, whole_chunks=False):
+        self._last_flush = time.monotonic()
+        rows = self._buffered - self._buffered % self.chunk_size if whole_chunks else self._buffered
+        if not rows:
+            return
+        if not self._writing:
+            self._clear_partial_chunks()
+            self._writing = True
+        data = {name: np.concatenate(parts) for name, parts in self._buffer.items()}
+        for start in range(0, rows, self.chunk_size):
+            self._write_chunk({name: col[start:start + self.chunk_size] for name, col in data.items()})
+        self._buffer = {name: [col[rows:]] for name, col in data.items()}
+        self._buffered -= rows
+
+    def _write_chunk(self, data):
+        name = f"chunk_{len(self.chunks):06d}"
+        tmp_dir = os.path.join(self.path, f"{name}.tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        for column, values in data.items():
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), values)
+        os.replace(tmp_dir, os.path.join(self.path, name))
+        self.chunks.append(name)
+        self.num_rows += len(next(iter(data.values())))
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Memory-mapped arrays of one column, one per completed chunk
+    def iter_column(self, name):
+        for chunk in self.chunks:
+            yield np.load(os.path.join(self.path, chunk, f"{name}.npy"), mmap_mode="r")
+
+    # A whole column as one array
+    def column(self, name):
+        parts = list(self.iter_column(name))
+        if not parts:
+            return np.empty(0, dtype=self.columns[name])
+        return np.concatenate(parts)
+
+    def __len__(self):
+        return self.num_rows
+
+
+# Run walks through iter_walks and stream one WALK_COLUMNS record per walk into the
+# store, resuming after the walks that are already stored.  `record` turns a walk
+# result into its depth, e.g. operator.itemgetter(1) for move_and_extend_dragon or
+# the tree walks, whose one-element depth list counts as a single depth.  A walk
+# run with several horizons has to be reduced to one of them by `record`;
+# `params` holds the constant columns (steps, iterations, branching_factor, bias).
+# The walks run in tasks of `chunksize` walks and every task is appended as soon as
+# it is done, so the store checkpoints by time as well as on full chunks.
+def run_walks_to_store(store, walk, make_graph, n_walks, params, record, walk_args=(),
+                       walk_kwargs=None, start_node=0, processes=None, chunksize=None, stats=None):
+    offset = store.completed_rows
+    remaining = max(0, n_walks - offset)
+    if chunksize is None:
+        chunksize = max(1, min(STORE_TASK_WALKS, remaining // (4 * (processes or default_processes()))))
+    for depths in iter_walks(walk, make_graph, remaining, walk_args, walk_kwargs, start_node=start_node, extract=record,
+                             seed=store.seed, processes=processes, chunksize=chunksize, offset=offset, stats=stats):
+        if any(np.size(depth) != 1 for depth in depths):
+            raise ValueError("record must reduce every walk to a single depth, not one depth per horizon")
+        block = len(depths)
+        store.append(depth=np.ravel(depths), seed=spawn_seeds(store.seed, block, offset),
+                     **{name: np.full(block, value) for name, value in params.items()})
+        offset += block
+    store.flush()
+    return store
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+
+from .dragon import CACHE_ENV
+
+# Tracy-Widom distributions tabulated once and evaluated by interpolation.
+# The table comes from the Painleve II representation: with q the Hastings-McLeod
+# solution of q'' = s q + 2 q^3, q(s) ~ Ai(s) as s -> +inf,
+#   F2(s) = exp(-int_s^inf (x - s) q(x)^2 dx)
+#   F1(s) = exp(-1/2 int_s^inf q(x) dx) * sqrt(F2(s))
+# The ODE is integrated from the right tail towards -inf together with the
+# integrals, which gives the CDFs and PDFs on a dense grid in one pass.  Tables
+# are memoized per process and stored in the FRACTAL_WALKS_CACHE directory.
+
+# Table range and resolution: F1(-10) ~ 1e-18 and 1 - F1(8) ~ 1e-12
+GRID_START = -10.0
+GRID_STOP = 8.0
+GRID_POINTS = 36001
+
+# Mean and variance of TW1 and TW2, used for moment fits of location and scale
+MOMENTS = {1: (-1.2065335745820, 1.6077810345810), 2: (-1.7710868074116, 0.8131947928329)}
+
+_tables = {}
+
+# Integrate Painleve II and return the grid with TW1 and TW2 CDFs and PDFs
+def _painleve_table():
+    from scipy.integrate import quad, solve_ivp
+    from scipy.special import airy
+
+    # y = (q, q', u, v, w) with u = int_s^inf q^2, v = int_s^inf (x - s) q^2, w = int_s^inf q
+    def rhs(s, y):
+        q, dq, u, v, w = y
+        return [dq, s * q + 2 * q ** 3, -q ** 2, -u, -q]
+
+    grid = np.linspace(GRID_START, GRID_STOP, GRID_POINTS)
+    # Start on the Airy tail, where q = Ai up to terms of order Ai^3, with the
+    # closed forms of the Airy tail integrals
+    s0 = GRID_STOP
+    ai, dai, _, _ = airy(s0)
+    u0 = dai ** 2 - s0 * ai ** 2
+    v0 = (2 * s0 ** 2 * ai ** 2 - 2 * s0 * dai ** 2 - ai * dai) / 3
+    w0 = quad(lambda x: airy(x)[0], s0, np.inf)[0]
+    start = [ai, dai, u0, v0, w0]
+    sol = solve_ivp(rhs, (GRID_STOP, GRID_START), start, t_eval=grid[::-1],
+                    method="DOP853", rtol=1e-13, atol=1e-300)
+    q, _, u, v, w = (row[::-1] for row in sol.y)
+
+    cdf2 = np.exp(-v)
+    pdf2 = cdf2 * u
+    cdf1 = np.exp(-0.5 * (v + w))
+    pdf1 = cdf1 * 0.5 * (u + q)
+    return {"x": grid, "cdf1": cdf1, "pdf1": pdf1, "cdf2": cdf2, "pdf2": pdf2}
+
+# Grid with the CDF and PDF columns of both distributions, computed once per cache
+def tracy_widom_table(cache_dir=None):
+    if "table" in _tables:
+        return _tables["table"]
+    cache_dir = os.environ.get(CACHE_ENV) if cache_dir is None else cache_dir
+    cache_path = os.path.join(cache_dir, f"tracy_widom_{GRID_POINTS}.npz") if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            table = {name: data[name] for name in data.files}
+    else:
+        table = _painleve_table()
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, **table)
+            os.replace(tmp_path, cache_path)
+    _tables["table"] = table
+    return table
+
+def _check_beta(beta):
+    if beta not in (1, 2):
+        raise ValueError("only beta = 1 (GOE) and beta = 2 (GUE) are tabulated")
+
+# Vectorized TW CDF of (x - loc) / scale for arrays of any shape
+def tw_cdf(x, loc=0.0, scale=1.0, beta=1):
+    _check_beta(beta)
+    table = tracy_widom_table()
+    z = (np.asarray(x, dtype=float) - loc) / scale
+    return np.interp(z, table["x"], table[f"cdf{beta}"], left=0.0, right=1.0)
+
+# Vectorized TW PDF of (x - loc) / scale
+def tw_pdf(x, loc=0.0, scale=1.0, beta=1):
+    _check_beta(beta)
+    table = tracy_widom_table()
+    z = (np.asarray(x, dtype=float) - loc) / scale
+    return np.interp(z, table["x"], table[f"pdf{beta}"], left=0.0, right=0.0) / scale
+
+# Quantile function, by inverting the tabulated CDF
+def tw_ppf(p, loc=0.0, scale=1.0, beta=1):
+    _check_beta(beta)
+    table = tracy_widom_table()
+    cdf = table[f"cdf{beta}"]
+    keep = np.concatenate([[True], np.diff(cdf) > 0])
+    return loc + scale * np.interp(p, cdf[keep], table["x"][keep])
+
+# Location and scale matching the sample mean and variance.  Works along the last
+# axis, so a 2-D array of samples gets one location and scale per row.
+def tw_fit(sample, beta=1):
+    _check_beta(beta)
+    mean, var = MOMENTS[beta]
+    sample = np.asarray(sample, dtype=float)
+    scale = sample.std(axis=-1, ddof=1) / np.sqrt(var)
+    return sample.mean(axis=-1) - mean * scale, scale
@@ -0,0 +1,56 @@
+import numpy as np
+
+from .graph import FractalGraph
+
+# Function to create a tree graph with a given depth and branching factor
+def create_tree_graph(depth, branching_factor, start_node=0):
+    # Nodes are numbered level by level, so the parent of node i is (i - 1) // b
+    num_nodes = sum(branching_factor ** level for level in range(depth + 1))
+    children = np.arange(1, num_nodes)
+    parents = (children - 1) // branching_factor
+    G = FractalGraph.from_edges(parents + start_node, children + start_node,
+                                num_nodes=start_node + num_nodes, directed=True)
+    return G, start_node + num_nodes - 1
+
+# Function to extend the graph by adding a new sub-tree from a specific node
+def extend_graph_from_node(G, node, depth, branching_factor, current_max_id):
+    # Only the first level of the new sub-tree is ever attached to the node, so
+    # the deeper levels are not built at all
+    if depth > 0:
+        for child in range(current_max_id + 1, current_max_id + branching_factor + 1):
+            G.add_edge(node, child)
+        return current_max_id + branching_factor
+    return current_max_id
+
+# Implicit, effectively infinite tree with heap-style node ids: the root is 0 and
+# the children of node n are n * b + 1 ... n * b + b, so parents and children are
+# computed rather than stored.  Only the nodes the walker has extended beyond the
+# initial depth are remembered, which is what decides whether a node is a leaf.
+class ImplicitTree:
+    def __init__(self, depth, branching_factor):
+        self.depth = depth # Nodes above this level start with their children attached
+        self.branching_factor = branching_factor
+        self.extended = set()
+
+    def parent(self, node):
+        return (node - 1) // self.branching_factor if node > 0 else None
+
+    def children(self, node):
+        first = node * self.branching_factor + 1
+        return range(first, first + self.branching_factor)
+
+    def level(self, node):
+        level = 0
+        while node > 0:
+            node = (node - 1) // self.branching_factor
+            level += 1
+        return level
+
+    def is_leaf(self, node, level):
+        return level >= self.depth and node not in self.extended
+
+    # Longest root-to-leaf path of the tree built so far
+    def longest_path_length(self):
+        if not self.extended:
+            return self.depth
+        return max(self.depth, max(self.level(node) for node in self.extended) + 1)
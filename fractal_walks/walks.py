@@ -0,0 +1,281 @@
+import random
+from bisect import bisect
+
+import numpy as np
+
+from .depth import depth_tracker
+from .dragon import generate_dragon_curve, dragon_curve_to_graph, LazyDragonGraph
+from .gasket import SierpinskiGasket
+from .paths import path_recorder, decode_path
+from .sampling import transition_table, uniform_source, choice_source, randrange_source
+from .tree import extend_graph_from_node
+
+# Observation horizons: the walks below accept a list of step counts and record
+# the depth after each of them during one trajectory.  The walk then runs up to
+# the largest horizon and returns one depth per horizon, in the given order, in
+# place of the single final depth.
+class Horizons:
+    def __init__(self, steps, horizons):
+        self.horizons = None if horizons is None else [int(h) for h in horizons]
+        self.steps = steps if horizons is None else max(self.horizons, default=0)
+        self._pending = sorted(set(self.horizons or ()), reverse=True)
+        self._values = {}
+        # Step count of the next observation, -1 when there is nothing left to record
+        self.next = self._pending.pop() if self._pending else -1
+
+    def record(self, value):
+        self._values[self.next] = value
+        self.next = self._pending.pop() if self._pending else -1
+
+    # Final result: the plain value without horizons, else one value per horizon
+    def result(self, final):
+        if self.horizons is None:
+            return final
+        return [self._values.get(h, final) for h in self.horizons]
+
+# Log-spaced schedule of horizons up to max_steps, e.g. for depth-vs-time scaling
+def log_horizons(max_steps, num=50):
+    return np.unique(np.geomspace(1, max_steps, num).astype(np.int64)).tolist()
+
+# Simulate a random walk on the Dragon Curve graph with dynamic extension
+# The depth (diameter of the visited subgraph) is tracked online as the walk
+# moves; pass a tracker from depth.py to read it while the walk is running, and a
+# render.VisitDensity as `visits` to bin every visited node into a heatmap.
+# The same walk runs on a SierpinskiGasket, which grows like a LazyDragonGraph
+# once the walker comes within 2^iterations_to_extend steps of its outer corners.
+# The step weights come from a sampling.TransitionTable: `transitions` is a bias
+# ratio (3, unvisited against visited neighbors, by default), a policy function or
+# a table.  `rng` is anything with the random.Random interface or a numpy
+# Generator, which the walks (all three) draw from in blocks.
+# All three walks time their phases and count events into an optional
+# instrument.WalkStats passed as `stats`, and keep their path as selected by
+# `record_path` (True, "nodes", "moves" or False, see paths.py).
+def move_and_extend_dragon(start_node, G, steps, iterations_to_extend, rng=None, tracker=None, horizons=None,
+                           visits=None, stats=None, record_path=True, transitions=None):
+    if stats is not None:
+        stats.start()
+    rng = random if rng is None else rng # Any object with the random.Random interface
+    draw = uniform_source(rng)
+    entries = transition_table(transitions).entries
+    horizons = Horizons(steps, horizons)
+    current_node = start_node
+    path = path_recorder(record_path, start_node, G.topology)
+    taken = horizons.steps
+    visited = bytearray(G.capacity)
+    visited[current_node] = 1
+    tracker = depth_tracker(G, start_node) if tracker is None else tracker
+
+    lazy = isinstance(G, (LazyDragonGraph, SierpinskiGasket))
+    margin = 2 ** iterations_to_extend
+
+    if horizons.next == 0:
+        horizons.record(0)
+    if visits is not None:
+        visits.record(current_node)
+    if stats is not None:
+        initial_nodes = G.num_nodes
+        stats.lap("setup")
+
+    # Perform the random walk for the given number of steps
+    for step in range(1, horizons.steps + 1):
+        # A lazily grown graph appends the next part of the fractal once the walker gets close to its end
+        if lazy and G.grow_towards(current_node, margin):
+            visited.extend(bytes(G.capacity - len(visited)))
+            tracker.invalidate()
+            if stats is not None:
+                stats.count("extensions")
+        if stats is not None:
+            stats.lap("extension")
+
+        neighbors = G.neighbors(current_node).tolist()
+        if stats is not None:
+            stats.lap("neighbors")
+        if neighbors:
+            # Extend a fixed graph that is smaller than one extension curve
+            if not lazy and G.num_nodes < (2 ** iterations_to_extend) + 1:
+                curve = generate_dragon_curve(iterations_to_extend)
+                G.compose(dragon_curve_to_graph(curve, lattice=G.coords is not None))
+                visited.extend(bytes(G.capacity - len(visited)))
+                if stats is not None:
+                    stats.count("extensions")
+                    stats.lap("extension")
+
+            # Cumulative weights for the visited flags of the neighbors, by default
+            # weight 3 for unvisited neighbors and 1 for visited ones
+            key = 1 << len(neighbors)
+            for slot, neighbor in enumerate(neighbors):
+                if visited[neighbor]:
+                    key |= 1 << slot
+            cumulative, total = entries[key]
+            if stats is not None:
+                stats.lap("weights")
+            next_node = neighbors[bisect(cumulative, draw() * total, 0, len(neighbors) - 1)]
+            if stats is not None:
+                stats.lap("choice")
+
+            if path is not None:
+                path.add(current_node, next_node, neighbors)
+            if not visited[next_node]:
+                visited[next_node] = 1
+                tracker.add(next_node, current_node)
+            elif stats is not None:
+                stats.count("backtracks")
+            if visits is not None:
+                visits.record(next_node)
+            current_node = next_node
+            if step == horizons.next:
+                horizons.record(tracker.depth)
+            if stats is not None:
+                stats.lap("depth")
+        else:
+            taken = step - 1
+            break
+
+    if visits is not None:
+        visits.flush()
+    depths = horizons.result(tracker.depth)
+    if stats is not None:
+        stats.lap("depth")
+        stats.count("steps", taken)
+        stats.count("nodes_added", G.num_nodes - initial_nodes)
+        stats.count("distinct_nodes", visited.count(1))
+    return None if path is None else path.result(), depths, G
+
+# Perform a random walk and dynamically extend the graph as needed
+# A leaf only sees its parent when the walker reaches it, so the new children are
+# reachable from its next visit on; with eager=True the leaf is extended before
+# the walker picks its next node and the children are reachable at once.
+def move_and_extend(start_node, G, steps=100, depth_to_extend=2, branching_factor=3, rng=None, horizons=None,
+                    stats=None, eager=False, record_path=True):
+    if stats is not None:
+        stats.start()
+    rng = random if rng is None else rng # Any object with the random.Random interface
+    choice = choice_source(rng)
+    horizons = Horizons(steps, horizons)
+    current_node = start_node
+    path = path_recorder(record_path, start_node, G.topology) # Store the path of the random walk
+    taken = horizons.steps
+    current_max_id = G.num_nodes - 1  # Track the current maximum node ID
+    depth = G.longest_path_length()  # Longest path, updated whenever a leaf is extended
+    if horizons.next == 0:
+        horizons.record(depth)
+    if stats is not None:
+        initial_nodes = G.num_nodes
+        stats.lap("setup")
+    for step in range(1, horizons.steps + 1):
+        if eager and not G.has_successors(current_node):
+            current_max_id, depth = _extend_leaf(G, current_node, depth_to_extend, branching_factor, current_max_id,
+                                                 depth, stats)
+        # Successors and predecessor of the current node
+        neighbors = G.neighbors(current_node).tolist()
+        if stats is not None:
+            stats.lap("neighbors")
+        if neighbors:
+            # Extend the graph if the current node has no successors
+            if not G.has_successors(current_node):
+                current_max_id, depth = _extend_leaf(G, current_node, depth_to_extend, branching_factor,
+                                                     current_max_id, depth, stats)
+            if stats is not None:
+                stats.lap("extension")
+            # Randomly choose the next node
+            next_node = choice(neighbors)
+            if stats is not None:
+                stats.lap("choice")
+                if next_node == G.pred[current_node]:
+                    stats.count("backtracks")
+            if path is not None:
+                path.add(current_node, next_node, neighbors)
+            current_node = next_node
+            if step == horizons.next:
+                horizons.record(depth)
+        else:
+            taken = step - 1
+            break
+    path = None if path is None else path.result()
+    depths = horizons.result([depth])
+    if stats is not None:
+        stats.lap("depth")
+        _count_path(stats, taken, path, G, start_node)
+        stats.count("nodes_added", G.num_nodes - initial_nodes)
+    return path, depths
+
+# Extend a leaf of the tree walk, returns the new maximum node id and depth
+def _extend_leaf(G, node, depth_to_extend, branching_factor, current_max_id, depth, stats):
+    current_max_id = extend_graph_from_node(G, node, depth_to_extend, branching_factor, current_max_id)
+    if G.has_successors(node):
+        depth = max(depth, int(G.level[node]) + 1)
+    if stats is not None:
+        stats.count("extensions")
+    return current_max_id, depth
+
+# Same walk as move_and_extend on an ImplicitTree.  Node ids are computed from the
+# heap layout, the current level is carried along with the node and the longest
+# path grows by one whenever a leaf deeper than all previous ones is extended,
+# so no edges are stored and no longest-path pass is needed at the end.
+def move_and_extend_implicit(start_node, T, steps=100, depth_to_extend=2, branching_factor=3, rng=None, horizons=None,
+                             stats=None, record_path=True):
+    if stats is not None:
+        stats.start()
+    rng = random if rng is None else rng # Any object with the random.Random interface
+    randrange = randrange_source(rng)
+    horizons = Horizons(steps, horizons)
+    b = T.branching_factor
+    current_node = start_node
+    level = T.level(start_node)
+    path = path_recorder(record_path, start_node, "implicit", b)
+    taken = horizons.steps
+    depth = T.longest_path_length()
+    if horizons.next == 0:
+        horizons.record(depth)
+    if stats is not None:
+        initial_extended = len(T.extended)
+        stats.lap("setup")
+    for step in range(1, horizons.steps + 1):
+        has_parent = current_node > 0
+        if T.is_leaf(current_node, level):
+            # A leaf only sees its parent, the extension is used from the next visit on
+            if not has_parent:
+                taken = step - 1
+                break
+            if depth_to_extend > 0:
+                T.extended.add(current_node)
+                depth = max(depth, level + 1)
+            choice = b
+            if stats is not None:
+                stats.lap("extension")
+        else:
+            choice = randrange(b + has_parent)
+            if stats is not None:
+                stats.lap("choice")
+
+        if choice == b:
+            next_node = (current_node - 1) // b
+            level -= 1
+            if stats is not None:
+                stats.count("backtracks")
+        else:
+            next_node = current_node * b + 1 + choice
+            level += 1
+        if path is not None:
+            path.add(current_node, next_node, choice)
+        current_node = next_node
+        if step == horizons.next:
+            horizons.record(depth)
+    path = None if path is None else path.result()
+    depths = horizons.result([depth])
+    if stats is not None:
+        stats.lap("depth")
+        _count_path(stats, taken, path, T, start_node)
+        # Every extension gives a leaf its b children
+        extensions = len(T.extended) - initial_extended
+        stats.count("extensions", extensions)
+        stats.count("nodes_added", extensions * b)
+    return path, depths
+
+# Steps and distinct visited nodes of a finished tree walk, the nodes are only
+# counted when the path was recorded
+def _count_path(stats, taken, path, G, start_node):
+    stats.count("steps", taken)
+    if path is not None:
+        targets = decode_path(path, G)[:, 1]
+        stats.count("distinct_nodes", len(np.union1d(targets, [start_node])))
@@ -0,0 +1,30 @@
+import random
+import os
+import sys
+
+# Make the shared fractal_walks package importable when running the script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from fractal_walks import generate_dragon_curve, LazyDragonGraph, move_and_extend_dragon
+from fractal_walks.render import VisitDensity
+
+# Simulation Parameters
+iterations = 20 # Iterations for the initial Dragon Curve, the graph grows lazily from there
+steps = 10 ** 6 # Number of steps for the random walk
+iterations_to_extend = 3
+extent_iterations = 22 # The heatmap covers the bounding box of this iteration of the curve
+width = 1024 # Image width in pixels
+frame_every = 10 ** 5 # Save a frame every this many steps, None for the final image only
+seed = None # Seed of the walk, set an integer to make it reproducible
+
+if __name__ == "__main__":
+    G = LazyDragonGraph(iterations)
+    bounds = generate_dragon_curve(extent_iterations)
+    extent = (bounds[:, 0].min(), bounds[:, 0].max(), bounds[:, 1].min(), bounds[:, 1].max())
+
+    # Bin every visited node into the heatmap while the walk runs
+    density = VisitDensity(lambda: G.curve, extent=extent, width=width, frame_every=frame_every,
+                           frame_pattern="dragon_density_{frame:05d}.png")
+    _, depth, G = move_and_extend_dragon(0, G, steps, iterations_to_extend, rng=random.Random(seed), visits=density,
+                                         record_path=False)
+    density.save("dragon_density.png")
+    print(f"Depth: {depth}, visits outside the image: {density.outside}")
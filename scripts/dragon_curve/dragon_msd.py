@@ -0,0 +1,50 @@
+import matplotlib.pyplot as plt
+import os
+import sys
+
+# Make the shared fractal_walks package importable when running the script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from fractal_walks import (generate_dragon_curve, dragon_curve_to_graph, batch_move_and_extend_dragon, log_horizons,
+                           BatchMSD)
+
+# Simulation Parameters
+N = 2000 # Number of random walks
+iterations = 14 # Iterations of the Dragon Curve, large enough that no walker reaches its ends
+steps = 5000 # Number of steps for the random walk
+iterations_to_extend = 3
+bias = 1 # Weight of an unvisited neighbor against 1 for a visited one, 1 for the unbiased walk
+seed = None # Seed of the run, set an integer to make it reproducible
+
+if __name__ == "__main__":
+    curve = generate_dragon_curve(iterations)
+    G = dragon_curve_to_graph(curve, lattice=True)
+    # Start in the middle of the curve, lattice nodes are numbered by first visit so look its site up
+    start_node = int(G.index.lookup(curve[len(curve) // 2]))
+    # The walkers advance in lockstep and their squared displacements in lattice coordinates are
+    # summed at log-spaced checkpoints, without storing any trajectory
+    observer = BatchMSD(G, steps, log_horizons(steps))
+    batch_move_and_extend_dragon(N, start_node, G, steps, iterations_to_extend, rng=seed, visits=observer,
+                                 transitions=bias)
+    msd = observer.msd
+    walk_fit = msd.walk_dimension()
+    spectral_fit = msd.spectral_dimension("returns")
+    print(walk_fit)
+    print(spectral_fit)
+
+    # Mean squared displacement on log-log axes with the fitted power law
+    t = msd.checkpoints
+    plt.figure(figsize=(10, 6))
+    plt.errorbar(t, msd.msd, yerr=1.96 * msd.msd_stderr, fmt="o", markersize=4, label="Ensemble MSD")
+    first = t >= walk_fit.fit_range[0]
+    scale = msd.msd[first][0] / t[first][0] ** walk_fit.exponent
+    plt.plot(t[first], scale * t[first] ** walk_fit.exponent, color="red", linewidth=2,
+             label=f"t^{walk_fit.exponent:.3f}, walk dimension {walk_fit.dimension:.3f}")
+    plt.xscale("log")
+    plt.yscale("log")
+    plt.title(f"Mean Squared Displacement on the Dragon Curve : n = {iterations}, Simulations = {N} : Probabilty {bias} to 1")
+    plt.xlabel("Steps")
+    plt.ylabel("Mean squared displacement")
+    plt.legend()
+    plt.grid(which="both", linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    plt.show()
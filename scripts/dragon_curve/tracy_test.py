@@ -1,115 +1,43 @@
-import numpy as np
-from scipy.stats import kstest
-from mpmath import mp
-from mpmath import meijerg
-import networkx as nx
-import random
+import os
+import sys
+from functools import partial
+from operator import itemgetter
 
-# Function to generate the Dragon Curve up to a specified number of iterations
-def generate_dragon_curve(iterations):
-    # Initialize the curve with the first two points
-    curve = [0 + 0j, 1 + 0j]
-    for _ in range(iterations):
-        # Generate the next segment by rotating and reversing
-        curve_extension = [1j * (p - curve[-1]) + curve[-1] for p in reversed(curve[:-1])]
-        curve.extend(curve_extension)
-    return curve
-
-# Convert the Dragon Curve into a graph representation
-def dragon_curve_to_graph(curve):
-    G = nx.Graph()
-    # Add edges between consecutive points
-    for i in range(len(curve) - 1):
-        G.add_edge(i, i + 1)
-    return G
-
-# Simulate a random walk on the Dragon Curve graph with dynamic extension
-def move_and_extend_dragon(start_node, G, steps, iterations_to_extend):
-    current_node = start_node
-    path = []
-    visited_nodes = {current_node}
-
-    # Perform the random walk for the given number of steps
-    for _ in range(steps):
-        neighbors = list(G.neighbors(current_node))
-        if neighbors:
-            # Extend the graph if needed
-            if len(G.nodes) < (2 ** iterations_to_extend) + 1:
-                curve = generate_dragon_curve(iterations_to_extend)
-                dragon_graph = dragon_curve_to_graph(curve)
-                G = nx.compose(G, dragon_graph)
-
-            # Calculate weights for unvisited and visited neighbors
-            weights = []
-            for neighbor in neighbors:
-                if neighbor not in visited_nodes:
-                    weights.append(3) # Higher weight for unvisited neighbors
-                else:
-                    weights.append(1) # Lower weight for visited neighbors
-
-            # Calculate probabilities for moving to each neighbor
-            total_weight = sum(weights)
-            probabilities = [w / total_weight for w in weights]
-            next_node = random.choices(neighbors, weights=probabilities, k=1)[0]
-
-            path.append((current_node, next_node))
-            current_node = next_node
-            visited_nodes.add(current_node)
-        else:
-            break
-
-    # Calculate the diameter of the visited subgraph (for depth of the graph)
-    visited_subgraph = G.subgraph(visited_nodes)
-    depth = nx.diameter(visited_subgraph)
-    return path, depth, G
+# Make the shared fractal_walks package importable when running the script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from fractal_walks import generate_dragon_curve, dragon_curve_to_graph, move_and_extend_dragon, run_walks, tw_fit
+from fractal_walks import TracyWidomFamily, bootstrap_ci, parametric_bootstrap
 
 # Simulation Parameters
 N = 1000 # Number of simulations
 iterations = 9 # Iterations for the initial Dragon Curve
 steps = 2000 # Number of steps for the random walk
 iterations_to_extend = 3
+seed = None # Master seed of the run, set an integer to make it reproducible
+n_resamples = 1000 # Bootstrap resamples for the confidence interval and the p-value
 
-result = []
-for i in range(N):
-    # Generate the initial Dragon Curve graph
-    curve = generate_dragon_curve(iterations)
-    dragon_graph = dragon_curve_to_graph(curve)
+if __name__ == "__main__":
+    # Every walk starts from a fresh graph of the initial Dragon Curve
+    make_graph = partial(dragon_curve_to_graph, generate_dragon_curve(iterations))
     start_node = 0
-    # Perform the random walk and store the resulting depth
-    _, depth, _ = move_and_extend_dragon(start_node, dragon_graph, steps, iterations_to_extend)
-    result.append(depth)
-    print(i)
-
-# Define the Tracy-Widom distribution (TW1) PDF using the Meijer G-function
-def tracy_widom_pdf(x):
-    pdf = []
-    with mp.workdps(50): # High precision for numerical computation
-        for val in x:
-            if val > 0:
-                # Calculate PDF using Meijer G-function
-                result = meijerg([[], [0.5]], [[-0.5, 0], []], -val)
-                pdf.append(float(mp.re(result)))  # Take only the real part
-            else:
-                pdf.append(0) # Tracy-Widom PDF is zero for non-positive values
-    return np.array(pdf)
-
-# Calculate the CDF from the PDF
-def tracy_widom_cdf(x):
-    pdf_vals = tracy_widom_pdf(x)
-    cdf_vals = np.cumsum(pdf_vals) * (x[1] - x[0]) # Numerical integration for CDF
-    return cdf_vals / cdf_vals[-1] # Normalize to make it a proper CDF
-
-# Generate theoretical Tracy-Widom PDF values
-x_vals = np.linspace(min(result), max(result), 500)
-pdf_vals = tracy_widom_pdf(x_vals)
-
-# Perform the Kolmogorov-Smirnov Test to compare the data with the Tracy-Widom distribution
-cdf_vals = tracy_widom_cdf(x_vals)
-ks_stat, p_value = kstest(result, lambda x: np.interp(x, x_vals, cdf_vals))
-print(f"KS Statistic: {ks_stat}, P-value: {p_value}")
-
-# Interpret the result of the KS test
-if p_value > 0.05:
-    print("The data is likely from the Tracy-Widom distribution (fail to reject H0).")
-else:
-    print("The data is not from the Tracy-Widom distribution (reject H0).")
\ No newline at end of file
+    # Perform the random walks on all cores and store the resulting depths
+    result = run_walks(move_and_extend_dragon, make_graph, N, walk_args=(steps, iterations_to_extend),
+                       walk_kwargs={"record_path": False}, start_node=start_node, extract=itemgetter(1), seed=seed)
+
+    # Fit the location and scale of the Tracy-Widom distribution (TW1) to the depths
+    loc, scale = tw_fit(result)
+    print(f"TW1 location: {loc}, scale: {scale}")
+
+    # Perform the Kolmogorov-Smirnov Test to compare the data with the Tracy-Widom distribution.
+    # The location and scale are estimated from the data, so the p-value comes from a
+    # parametric bootstrap that re-fits every simulated sample the same way.
+    family = TracyWidomFamily(beta=1)
+    ks_stat, low, high = bootstrap_ci(result, "ks", family, n_resamples=n_resamples, seed=seed, processes=None)
+    _, p_value = parametric_bootstrap(result, "ks", family, n_resamples=n_resamples, seed=seed, processes=None)
+    print(f"KS Statistic: {ks_stat} (95% CI {low} to {high}), P-value: {p_value}")
+
+    # Interpret the result of the KS test
+    if p_value > 0.05:
+        print("The data is likely from the Tracy-Widom distribution (fail to reject H0).")
+    else:
+        print("The data is not from the Tracy-Widom distribution (reject H0).")
\ No newline at end of file
@@ -0,0 +1,46 @@
+import matplotlib.pyplot as plt
+import os
+import sys
+from functools import partial
+from operator import itemgetter
+
+# Make the shared fractal_walks package importable when running the script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from fractal_walks import SierpinskiGasket, move_and_extend_dragon, run_sequential, plot_histogram
+
+# Simulation parameters
+max_walks = 10000 # Budget of random walks, the run stops earlier once the estimates are precise enough
+batch_size = 250 # Walks between two checks of the stopping criteria
+mean_width = 1.0 # Stop once the 95% confidence interval of the mean depth is narrower than this
+level = 4 # Level of the initial Sierpinski gasket, it grows once the walker approaches an outer corner
+lazy = True # Set False to keep the walker on the fixed level-`level` gasket
+levels_to_extend = 2 # The gasket grows when the walker is within 2^levels_to_extend steps of an outer corner
+horizons = [1000, 1001] # Steps at which the depth is recorded
+bias = 3 # Weight of an unvisited neighbor against 1 for a visited one
+seed = None # Master seed of the run, set an integer to make it reproducible
+
+if __name__ == "__main__":
+    # Every walk starts at the origin corner of a fresh gasket, which stores no edges
+    make_graph = partial(SierpinskiGasket, level, lazy)
+    start_node = 0
+    # Count the depths (diameters of the visited subgraph) after 1000 and after 1001 steps of each
+    # random walk into a histogram, in batches of walks until the mean depth is precise enough
+    run = run_sequential(move_and_extend_dragon, make_graph, walk_args=(None, levels_to_extend),
+                         walk_kwargs={"transitions": bias, "horizons": horizons, "record_path": False}, start_node=start_node, extract=itemgetter(1), seed=seed,
+                         batch_size=batch_size, max_walks=max_walks, mean_width=mean_width)
+    print(run.report())
+    result = run.histogram
+
+    # Plotting the histogram and KDE
+    plt.figure(figsize=(10, 6))
+
+    # Plot histogram of depths with the KDE (Kernel Density Estimation) scaled to align with its frequencies
+    freq, bins = plot_histogram(result, bins=range(int(result.min), int(result.max) + 2))
+
+    # Customize the plot
+    plt.title(f"Histogram for Sierpinski Gasket : Level = {level}, Simulations = {run.n_walks}, Steps per Simulation = {1000 & 1001} : Probabilty {bias} to 1")
+    plt.xlabel("Depth")
+    plt.ylabel("Frequency")
+    plt.legend()
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.show()
@@ -1,84 +1,54 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import random
-import networkx as nx
+import os
+import sys
+from functools import partial
+from operator import itemgetter
 
-# Function to create a tree graph with a given depth and branching factor
-def create_tree_graph(depth, branching_factor, start_node=0):
-    G = nx.DiGraph() # Create a directed graph to represent the tree
-    node_id = start_node # Initialize the node ID
-    nodes_at_current_depth = [node_id]  # Nodes at the current depth level
-    for level in range(depth):
-        next_nodes = []
-        for parent in nodes_at_current_depth:
-            for i in range(branching_factor):
-                node_id += 1
-                G.add_edge(parent, node_id) # Add edges from parent to child
-                next_nodes.append(node_id)
-        nodes_at_current_depth = next_nodes # Move to the next depth level
-    return G, node_id
-
-# Function to extend the graph by adding a new sub-tree from a specific node
-def extend_graph_from_node(G, node, depth, branching_factor, current_max_id):
-    # Generate a new subgraph and connect it to the given node
-    new_subgraph, new_max_id = create_tree_graph(depth, branching_factor, start_node=current_max_id + 1)
-    G.add_edges_from((node, child) for parent, child in new_subgraph.edges() if parent == current_max_id + 1)
-    return new_max_id
-
-# Perform a random walk and dynamically extend the graph as needed
-def move_and_extend(start_node, G, steps=100, depth_to_extend=2, branching_factor=3):
-    current_node = start_node
-    path = [] # Store the path of the random walk
-    current_max_id = max(G.nodes)  # Track the current maximum node ID
-    for _ in range(steps):
-        neighbors = list(G.neighbors(current_node)) + list(G.predecessors(current_node))
-        if neighbors:
-            # Extend the graph if the current node has no successors
-            if not list(G.successors(current_node)):
-                current_max_id = extend_graph_from_node(G, current_node, depth_to_extend, branching_factor, current_max_id)
-            # Randomly choose the next node
-            next_node = random.choice(neighbors)
-            path.append((current_node, next_node))
-            current_node = next_node
-        else:
-            break
-    # Measure the longest path length in the graph (depth)
-    depths = [nx.dag_longest_path_length(G)]
-    return path, depths
+# Make the shared fractal_walks package importable when running the script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from fractal_walks import create_tree_graph, move_and_extend, run_sequential
 
 # Simulation parameters
-N = 1000 # Number of random walks to simulate
+max_walks = 10000 # Budget of random walks, the run stops earlier once the estimates are precise enough
+batch_size = 250 # Walks between two checks of the stopping criteria
+mean_width = 1.0 # Stop once the 95% confidence interval of the mean depth is narrower than this
+median_width = 2 # ... and the one of the median depth narrower than this
 depth = 2 # Initial depth of the tree
 branching_factor = 3 # Number of children for each node
 steps = 1000 # Steps in the random walk
 depth_to_extend = 2 # Depth of tree extensions
+seed = None # Master seed of the run, set an integer to make it reproducible
 
-result = []
-for i in range(N):
-    tree_graph, max_id = create_tree_graph(depth, branching_factor)  # Create the initial tree graph
+if __name__ == "__main__":
+    make_graph = partial(create_tree_graph, depth, branching_factor)  # Builds the initial tree graph of each walk
     start_node = 0  # Start the random walk at node 0
-    random_walk_path, depths = move_and_extend(start_node, tree_graph, steps, depth_to_extend, branching_factor)
-    result.extend(depths)  # Append depths to results
-    print(i)
-
-plt.figure(figsize=(10, 6))
-plt.boxplot(result, vert=False, patch_artist=True, notch=True,
-            boxprops=dict(facecolor="lightblue", color="blue"),
-            medianprops=dict(color="red", linewidth=2),
-            whiskerprops=dict(color="blue", linewidth=1.5),
-            capprops=dict(color="blue", linewidth=1.5),
-            flierprops=dict(markerfacecolor='orange', marker='o', markersize=6))
-plt.title("Boxplot of Graph Depths")
-
-mean_depth = np.mean(result)
-median_depth = np.median(result)
-
-plt.axvline(mean_depth, color='green', linestyle='--', label=f"Mean: {mean_depth:.2f}")
-plt.axvline(median_depth, color='red', linestyle='-', label=f"Median: {median_depth:.2f}")
-
-plt.title("Histogram for Sierpinski Fractal : Iterations = {1000}, Steps per Iteration = {2000}")
-plt.xlabel("Graph Depth")
-plt.legend()
-plt.grid(axis='x', linestyle='--', alpha=0.7)
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+    # Perform the random walks on all cores in batches until the mean and median depths are precise enough
+    run = run_sequential(move_and_extend, make_graph, walk_args=(steps, depth_to_extend, branching_factor),
+                         walk_kwargs={"record_path": False}, start_node=start_node, extract=itemgetter(1), seed=seed,
+                         batch_size=batch_size, max_walks=max_walks, mean_width=mean_width,
+                         quantile_widths={0.5: median_width}, keep_values=True)
+    print(run.report())
+    result = [d for depths in run.values for d in depths]  # Append depths to results
+
+    plt.figure(figsize=(10, 6))
+    plt.boxplot(result, vert=False, patch_artist=True, notch=True,
+                boxprops=dict(facecolor="lightblue", color="blue"),
+                medianprops=dict(color="red", linewidth=2),
+                whiskerprops=dict(color="blue", linewidth=1.5),
+                capprops=dict(color="blue", linewidth=1.5),
+                flierprops=dict(markerfacecolor='orange', marker='o', markersize=6))
+    plt.title("Boxplot of Graph Depths")
+
+    mean_depth = np.mean(result)
+    median_depth = np.median(result)
+
+    plt.axvline(mean_depth, color='green', linestyle='--', label=f"Mean: {mean_depth:.2f}")
+    plt.axvline(median_depth, color='red', linestyle='-', label=f"Median: {median_depth:.2f}")
+
+    plt.title("Histogram for Sierpinski Fractal : Iterations = {1000}, Steps per Iteration = {2000}")
+    plt.xlabel("Graph Depth")
+    plt.legend()
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    plt.show()
\ No newline at end of file